@@ -5,7 +5,7 @@ from monitor import setup_scheduler, scheduler
 from config import Config
 from utils import setup_logging
 from auth_manager import AuthManager
-import asyncio
+from event_loop import get_event_loop_service
 
 app = Flask(__name__)
 socketio = SocketIO(app)
@@ -26,6 +26,15 @@ auth_manager = AuthManager(config, socketio, enable_nnmclub_scraper=ENABLE_NNMCL
 setup_routes(app, socketio, auth_manager, config)
 setup_scheduler(socketio, auth_manager, config)
 
+# Общий цикл событий: в нём живут все асинхронные ресурсы приложения
+get_event_loop_service().start()
+
+# Фоновая очередь переименования завершённых загрузок
+auth_manager.rename_queue.start()
+
+# Рабочие задачи очереди сканирования для ручных запусков и планировщика
+auth_manager.scan_queue.start()
+
 # Автозапуск мониторинга только если auto_start включён
 if config.get("auto_start", False):
     app.config['scheduler_running'] = True
@@ -39,16 +48,7 @@ else:
 # Запускаем инициализацию авторизации после старта приложения
 @socketio.on('connect')
 def handle_connect():
-    def run_async_task():
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            loop.run_until_complete(auth_manager.initialize())
-        finally:
-            loop.close()
-    
-    import threading
-    threading.Thread(target=run_async_task, daemon=True).start()
+    get_event_loop_service().submit(auth_manager.initialize())
 
 if __name__ == "__main__":
     socketio.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
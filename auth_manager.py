@@ -1,12 +1,19 @@
 import asyncio
 from typing import Dict, Optional
-from qbittorrentapi import Client, LoginFailed
+from qbittorrent_async import AsyncQBittorrentClient, QBittorrentLoginError
 import logging
 from scrapers.anilibria_scraper import AnilibriaScraper
 from scrapers.astar_bz_scraper import AstarBzScraper
 from scrapers.kinozal_scraper import KinozalScraper
 from scrapers.rutracker_scraper import RutrackerScraper
 from scrapers.nnmclub_scraper import NnmClubScraper
+from scrapers.rutracker_api import RutrackerTopicApi, DEFAULT_API_URL
+from qbittorrent_manager import QBittorrentManager
+from qbittorrent_mirror import QBittorrentMirror
+from rename_queue import RenameQueue
+from feed_poller import FeedPoller
+from preview_jobs import PreviewJobs, DEFAULT_PREVIEW_WORKERS, DEFAULT_PREVIEW_CACHE_TTL
+from scan_queue import ScanQueue
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +22,16 @@ class AuthManager:
         self.config = config
         self.socketio = socketio
         self.qb_client = None
+        self.qb_mirror = None
+        self.rename_queue = RenameQueue(self, socketio, interval=config.get("rename_check_interval", 30))
+        self.scan_queue = ScanQueue(self, socketio, config)
+        self.preview_jobs = PreviewJobs(
+            self, socketio,
+            workers=config.get("preview_workers", DEFAULT_PREVIEW_WORKERS),
+            result_ttl=config.get("preview_cache_ttl", DEFAULT_PREVIEW_CACHE_TTL)
+        )
+        self.feed_poller = FeedPoller(config)
+        self.rutracker_api = RutrackerTopicApi(config.get("rutracker_api_url", DEFAULT_API_URL))
         self.enable_nnmclub_scraper = enable_nnmclub_scraper
         self.scrapers: Dict[str, Optional[object]] = {
             "anilibria.top": AnilibriaScraper(),
@@ -33,18 +50,29 @@ class AuthManager:
     async def connect_qbittorrent(self):
         try:
             qb_config = self.config.get("qbittorrent")
-            client = Client(
+            client = self.qb_client
+            verify_ssl = qb_config.get("verify_ssl", True)
+            if client and (client.host, client.username, client.password, client.verify_ssl) == (qb_config["host"].rstrip("/"), qb_config["username"], qb_config["password"], verify_ssl):
+                # Настройки не менялись: проверяем подключение без нового входа и перезапуска зеркала
+                version = await client.app_version()
+                self.statuses["qbittorrent"] = {"status": f"Подключено (версия: {version})", "spinner": False}
+                return
+            client = AsyncQBittorrentClient(
                 host=qb_config["host"],
                 username=qb_config["username"],
                 password=qb_config["password"],
-                VERIFY_WEBUI_CERTIFICATE=False
+                verify_ssl=verify_ssl
             )
-            client.auth_log_in()
-            version = client.app.version
+            await client.login()
+            version = await client.app_version()
             self.qb_client = client
+            if self.qb_mirror:
+                self.qb_mirror.stop()
+            self.qb_mirror = QBittorrentMirror(client, interval=self.config.get("qb_sync_interval", 2))
+            self.qb_mirror.start()
             self.statuses["qbittorrent"] = {"status": f"Подключено (версия: {version})", "spinner": False}
             logger.info(f"Подключено к qBittorrent, версия: {version}")
-        except LoginFailed as e:
+        except QBittorrentLoginError as e:
             self.statuses["qbittorrent"] = {"status": f"Ошибка: Неверный логин/пароль", "spinner": False}
             logger.error(f"Ошибка входа в qBittorrent: {e}")
         except Exception as e:
@@ -53,17 +81,26 @@ class AuthManager:
         finally:
             self.socketio.emit('auth_status', self.statuses)
 
+    def get_tracker_scraper(self, domain: str, scraper_class, auth: dict):
+        """Текущий парсер трекера, если учётные данные не менялись, иначе новый (с сохранённой сессией, если она есть)."""
+        scraper = self.scrapers.get(domain)
+        if scraper and scraper.username == auth["username"] and scraper.password == auth["password"]:
+            return scraper
+        return scraper_class(auth["username"], auth["password"])
+
     async def connect_kinozal(self):
         kinozal_auth = self.config.get("kinozal_auth")
         if not kinozal_auth["username"] or not kinozal_auth["password"]:
             self.statuses["kinozal"] = {"status": "Нет данных для авторизации", "spinner": False}
         else:
             try:
-                scraper = KinozalScraper(kinozal_auth["username"], kinozal_auth["password"])
+                scraper = self.get_tracker_scraper("kinozal.tv", KinozalScraper, kinozal_auth)
+                restored = scraper.logged_in
+                await scraper.ensure_login()
                 self.scrapers["kinozal.tv"] = scraper
                 self.scrapers["kinozal.me"] = scraper
-                self.statuses["kinozal"] = {"status": "Авторизация успешна", "spinner": False}
-                logger.info("Успешная авторизация на Kinozal")
+                self.statuses["kinozal"] = {"status": "Сессия восстановлена" if restored else "Авторизация успешна", "spinner": False}
+                logger.info("Сессия Kinozal восстановлена" if restored else "Успешная авторизация на Kinozal")
             except Exception as e:
                 self.statuses["kinozal"] = {"status": f"Ошибка: {str(e)}", "spinner": False}
                 logger.error(f"Ошибка авторизации на Kinozal: {e}")
@@ -75,10 +112,12 @@ class AuthManager:
             self.statuses["rutracker"] = {"status": "Нет данных для авторизации", "spinner": False}
         else:
             try:
-                scraper = RutrackerScraper(rutracker_auth["username"], rutracker_auth["password"])
+                scraper = self.get_tracker_scraper("rutracker.org", RutrackerScraper, rutracker_auth)
+                restored = scraper.logged_in
+                await scraper.ensure_login()
                 self.scrapers["rutracker.org"] = scraper
-                self.statuses["rutracker"] = {"status": "Авторизация успешна", "spinner": False}
-                logger.info("Успешная авторизация на RuTracker")
+                self.statuses["rutracker"] = {"status": "Сессия восстановлена" if restored else "Авторизация успешна", "spinner": False}
+                logger.info("Сессия RuTracker восстановлена" if restored else "Успешная авторизация на RuTracker")
             except Exception as e:
                 self.statuses["rutracker"] = {"status": f"Ошибка: {str(e)}", "spinner": False}
                 logger.error(f"Ошибка авторизации на RuTracker: {e}")
@@ -102,6 +141,7 @@ class AuthManager:
         if domain == "nnmclub.to" and not self.enable_nnmclub_scraper:
             logger.info(f"Парсер для {domain} отключён")
             return None
+        # Созданный здесь парсер использует сохранённую сессию или авторизуется при первом запросе к сайту
         if domain in ["kinozal.tv", "kinozal.me"] and not self.scrapers[domain]:
             kinozal_auth = self.config.get("kinozal_auth")
             if kinozal_auth["username"] and kinozal_auth["password"]:
@@ -115,4 +155,11 @@ class AuthManager:
         return self.scrapers.get(domain)
 
     def get_qb_client(self):
-        return self.qb_client
\ No newline at end of file
+        return self.qb_client
+
+    def get_qb_mirror(self):
+        return self.qb_mirror
+
+    def get_qb_manager(self):
+        """Менеджер qBittorrent, читающий состояние торрентов из общего зеркала."""
+        return QBittorrentManager(self.qb_client, self.qb_mirror, self.rename_queue)
\ No newline at end of file
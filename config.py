@@ -39,6 +39,16 @@ class Config:
                 "password": ""
             },
             "scan_interval": 30,
+            "max_concurrent_scans": 8,
+            "domain_concurrency": {},
+            "qb_sync_interval": 2,
+            "rename_check_interval": 30,
+            "status_ttl": 600,
+            "preview_workers": 2,
+            "preview_cache_ttl": 300,
+            "feeds": {},
+            "feed_full_scan_every": 12,
+            "rutracker_api_url": "https://api.rutracker.cc/v1",
             "series": {},
             "last_scan": None,
             "auto_start": False
@@ -101,6 +111,7 @@ class Config:
             "quality": quality,
             "is_seasonal_torrent": is_seasonal_torrent,
             "torrent_ids": torrent_ids or [],
+            "info_hashes": {},  # Хэши добавленных раздач по torrent_id
             "last_updated": None  # Добавляем поле для даты обновления
         }
         self.save_config()
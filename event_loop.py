@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+class EventLoopService:
+    """Единственный долгоживущий цикл событий приложения в отдельном потоке.
+
+    Все асинхронные ресурсы (сессии aiohttp, клиент qBittorrent, зеркало, браузер,
+    очереди сканирования) живут в этом цикле, поэтому пулы соединений и кэши в памяти
+    сохраняются между сканированиями. Маршруты Flask и планировщик передают в него
+    корутины через submit() или run() из любого потока.
+    """
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self.loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True, name="event-loop")
+            self._thread.start()
+            ready.wait()
+        logger.info("Цикл событий приложения запущен")
+
+    def _run(self, ready: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        self.loop.run_forever()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Запускает корутину в цикле приложения и сразу возвращает Future её результата."""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Выполняет корутину в цикле приложения и ждёт результат в вызывающем потоке."""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("run() нельзя вызывать из цикла событий приложения, используйте await")
+        return self.submit(coro).result(timeout)
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug(f"Задача цикла событий завершилась ошибкой: {future.exception()}")
+
+_event_loop_service = EventLoopService()
+
+def get_event_loop_service() -> EventLoopService:
+    return _event_loop_service
@@ -0,0 +1,128 @@
+import asyncio
+import re
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from monitor import get_series_domain
+from scrapers.http_transport import HttpClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FULL_SCAN_EVERY = 12
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+# ID темы в ссылках трекеров: viewtopic.php?t=123 (RuTracker, NNMClub), details.php?id=123 (Kinozal)
+TOPIC_ID_RE = re.compile(r"[?&](?:t|id)=(\d+)")
+
+class FeedEntry(NamedTuple):
+    link: str
+    updated: str
+
+def parse_feed(content: bytes) -> List[FeedEntry]:
+    """Записи RSS 2.0 или Atom: ссылка на тему и отметка времени её обновления (строкой, как в ленте)."""
+    root = ET.fromstring(content)
+    entries = []
+    for item in root.iter("item"):
+        link = (item.findtext("link") or item.findtext("guid") or "").strip()
+        updated = (item.findtext("pubDate") or "").strip()
+        if link:
+            entries.append(FeedEntry(link, updated))
+    for entry in root.iter(f"{ATOM_NS}entry"):
+        link_elem = entry.find(f"{ATOM_NS}link")
+        link = (link_elem.get("href") if link_elem is not None else "") or ""
+        updated = (entry.findtext(f"{ATOM_NS}updated") or entry.findtext(f"{ATOM_NS}published") or "").strip()
+        if link:
+            entries.append(FeedEntry(link.strip(), updated))
+    return entries
+
+def entry_time(updated: str) -> Optional[datetime]:
+    """Отметка времени записи (RFC 822 в RSS, ISO 8601 в Atom) или None, если её не разобрать."""
+    try:
+        parsed = parsedate_to_datetime(updated)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(updated)
+        except ValueError:
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def is_newer(updated: str, current: str) -> bool:
+    """True, если отметка updated позже current; неразборчивые отметки не вытесняют уже найденную."""
+    new_time, current_time = entry_time(updated), entry_time(current)
+    return new_time is not None and (current_time is None or new_time > current_time)
+
+def topic_key(url: str) -> Optional[Tuple[str, str]]:
+    """Ключ (домен, ID темы) для сопоставления записей ленты с URL сериалов."""
+    match = TOPIC_ID_RE.search(url)
+    return (get_series_domain(url), match.group(1)) if match else None
+
+class FeedPoller:
+    """Выбор сериалов для сканирования по RSS/Atom лентам трекеров.
+
+    Для доменов, у которых в настройке "feeds" указаны ленты, сканируются только темы,
+    появившиеся в ленте с новой отметкой времени. Остальные домены сканируются как
+    раньше. Каждый full_scan_every-й цикл (и первый после запуска) сканирует всё,
+    чтобы не пропустить обновления, выпавшие из ленты между циклами.
+
+    Отметка времени темы считается просмотренной только после успешного сканирования
+    (mark_scanned): если сканирование не удалось, тема снова выбирается в следующем цикле.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.http = HttpClient(cache_scope="feeds")
+        self.cycle = 0
+        self.seen: Dict[Tuple[str, str], str] = {}
+        self.pending: Dict[Tuple[str, str], str] = {}  # Отметки из лент, ждущие успешного сканирования темы
+
+    async def fetch_feed(self, feed_url: str) -> List[FeedEntry]:
+        response = await self.http.get(feed_url, cached=True)
+        if response.status_code != 200:
+            raise Exception(f"Код ответа {response.status_code}")
+        return parse_feed(response.content)
+
+    async def poll(self, domain: str, feed_urls: List[str]) -> Optional[Dict[Tuple[str, str], str]]:
+        """Последние отметки времени тем из лент домена или None, если хотя бы одна лента недоступна."""
+        results = await asyncio.gather(*(self.fetch_feed(url) for url in feed_urls), return_exceptions=True)
+        latest = {}
+        for feed_url, result in zip(feed_urls, results):
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка чтения ленты {feed_url}: {result}, домен {domain} сканируется полностью")
+                return None
+            for entry in result:
+                key = topic_key(entry.link)
+                # Тема может встречаться в ленте несколько раз, порядок записей не гарантирован
+                if key and (key not in latest or is_newer(entry.updated, latest[key])):
+                    latest[key] = entry.updated
+        return latest
+
+    async def select_series(self, series_urls: List[str]) -> List[str]:
+        feeds = {get_series_domain(f"https://{domain}/"): urls for domain, urls in self.config.get("feeds", {}).items() if urls}
+        if not feeds:
+            return series_urls
+        full_scan = self.cycle % max(1, self.config.get("feed_full_scan_every", DEFAULT_FULL_SCAN_EVERY)) == 0
+        self.cycle += 1
+        domains = list(feeds)
+        polled = await asyncio.gather(*(self.poll(domain, feeds[domain]) for domain in domains))
+        updates = dict(zip(domains, polled))
+
+        selected = []
+        for series_url in series_urls:
+            domain = get_series_domain(series_url)
+            latest = updates.get(domain)
+            key = topic_key(series_url)
+            if full_scan or domain not in feeds or latest is None or key is None:
+                selected.append(series_url)
+            elif key in latest and latest[key] != self.seen.get(key):
+                logger.info(f"Тема {series_url} обновлена по ленте ({latest[key]})")
+                selected.append(series_url)
+            if latest and key in latest:
+                self.pending[key] = latest[key]
+        logger.info(f"Ленты трекеров: к сканированию {len(selected)} из {len(series_urls)} сериалов" + (" (полный цикл)" if full_scan else ""))
+        return selected
+
+    def mark_scanned(self, series_url: str):
+        """Запоминает отметку времени темы из ленты после её успешного сканирования."""
+        key = topic_key(series_url)
+        if key in self.pending:
+            self.seen[key] = self.pending.pop(key)
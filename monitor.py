@@ -1,13 +1,39 @@
 import asyncio
+import time
 from apscheduler.schedulers.background import BackgroundScheduler
 import logging
 from urllib.parse import urlparse
 from datetime import datetime
-from qbittorrent_manager import QBittorrentManager  # Добавляем импорт
+from scrapers.http_cache import get_torrent_cache
+from scrapers.rutracker_api import rutracker_topic_id
+from scan_snapshots import capture_snapshot, get_snapshot_store
+from event_loop import get_event_loop_service
+from torrent_utils import get_infohash
 
 logger = logging.getLogger(__name__)
 scheduler = BackgroundScheduler()
 
+# Ограничения параллельного сканирования по умолчанию.
+# Лимит по домену защищает трекеры от лишней нагрузки; для anilibria.top он равен числу вкладок общего браузера.
+DEFAULT_MAX_CONCURRENT_SCANS = 8
+DEFAULT_DOMAIN_CONCURRENCY = {
+    "rutracker.org": 4,
+    "kinozal.tv": 2,  # kinozal.me использует тот же лимит
+    "nnmclub.to": 2,
+    "astar.bz": 2,
+    "anilibria.top": 3
+}
+DEFAULT_UNKNOWN_DOMAIN_CONCURRENCY = 1
+
+def get_series_domain(series_url):
+    """Возвращает домен трекера для сериала, приводя зеркала к одному ключу."""
+    domain = urlparse(series_url).netloc
+    if domain.startswith('v6.'):
+        domain = domain[3:]
+    if domain == "kinozal.me":
+        domain = "kinozal.tv"
+    return domain
+
 def find_series_data(series_url, config):
     parsed_url = urlparse(series_url)
     series_domain = parsed_url.netloc
@@ -17,7 +43,30 @@ def find_series_data(series_url, config):
             return data
     return None
 
-async def scan_series(series_url, socketio, auth_manager, config):
+async def fetch_torrent_content(scraper, episode):
+    """Содержимое .torrent эпизода: из кэша, если раздача не обновлялась, иначе с трекера."""
+    torrent_cache = get_torrent_cache()
+    content = torrent_cache.get(episode["torrent_id"], episode["last_updated"])
+    if content:
+        logger.info(f"Торрент-файл {episode['torrent_id']} взят из кэша")
+        return content
+    content = await scraper.get_torrent_content(episode["torrent_url"])
+    # Кэшируется только настоящий .torrent: страница ошибки или защиты трекера осталась бы в кэше до смены даты раздачи
+    if isinstance(content, bytes) and get_infohash(content):
+        torrent_cache.put(episode["torrent_id"], episode["last_updated"], content)
+    return content
+
+async def record_snapshot(series_url, qb_manager, episodes, socketio):
+    """Сохраняет снимок сканирования сериала для окна статуса."""
+    try:
+        snapshot = await capture_snapshot(qb_manager, episodes, previous=get_snapshot_store().get(series_url))
+        # Запись на диск не должна задерживать цикл событий
+        await asyncio.to_thread(get_snapshot_store().put, series_url, snapshot)
+        socketio.emit('status_snapshot', {'series_url': series_url})
+    except Exception as e:
+        logger.error(f"Ошибка сохранения снимка для {series_url}: {e}")
+
+async def scan_series(series_url, socketio, auth_manager, config, torrent_index=None):
     series_data = find_series_data(series_url, config)
     if not series_data:
         logger.error(f"Сериал {series_url} не найден в конфигурации")
@@ -41,17 +90,20 @@ async def scan_series(series_url, socketio, auth_manager, config):
     if not episodes:
         logger.info(f"Завершено: эпизодов нет для {series_url}")
         socketio.emit('status_update', {'series_url': series_url, 'status': 'Завершено: эпизодов нет', 'progress': 0, 'total': 0})
-        return
-    qb_client = auth_manager.get_qb_client()
-    qb_manager = QBittorrentManager(qb_client) if qb_client else None  # Создаём qb_manager
+        await record_snapshot(series_url, None, episodes, socketio)
+        return {"added": 0, "skipped_identical": 0}
+    qb_manager = auth_manager.get_qb_manager() if auth_manager.get_qb_client() else None
     if not qb_manager:
         logger.error(f"Не удалось подключиться к qBittorrent для {series_url}")
         socketio.emit('status_update', {'series_url': series_url, 'status': 'Ошибка: нет подключения к qBittorrent', 'progress': 0, 'total': 0})
         return
-    qb_torrents = qb_client.torrents_info() if qb_client else []
+    if torrent_index is None:
+        torrent_index = await qb_manager.get_torrent_index()
     progress = 0
+    added = 0
+    skipped_identical = 0
     for episode in episodes:
-        torrent = next((t for t in qb_torrents if episode["torrent_id"] in t.tags), None)
+        torrent = torrent_index.get_by_tag(episode["torrent_id"])
         last_updated = datetime.fromisoformat(episode["last_updated"]) if episode["last_updated"] else None
         saved_updated = datetime.fromisoformat(series_data.get("last_updated")) if series_data.get("last_updated") else None
         
@@ -60,52 +112,138 @@ async def scan_series(series_url, socketio, auth_manager, config):
             progress += 1
             logger.info(f"Добавление: {episode['name']} для {series_url}")
             socketio.emit('status_update', {'series_url': series_url, 'status': f"Добавление: {episode['name']}", 'progress': progress, 'total': total_steps})
-            content = episode.get("magnet_link") or await scraper.get_torrent_content(episode["torrent_url"])
+            content = episode.get("magnet_link") or await fetch_torrent_content(scraper, episode)
             if content:
-                success, msg = await qb_manager.add_torrent(
-                    content, series_data["save_path"], episode["torrent_id"],
-                    series_data["rename_enabled"], series_data["series_name"], series_data["season"],
-                    socketio=socketio
-                )
+                info_hash = get_infohash(content)
+                seeded_hashes = {torrent.hash, series_data.get("info_hashes", {}).get(episode["torrent_id"])} if torrent else set()
+                if info_hash and info_hash in seeded_hashes:
+                    # Трекер обновил дату, но раздача та же: повторное добавление вызвало бы лишнюю перепроверку
+                    logger.info(f"Пропуск: {episode['name']} для {series_url} не изменился (хэш {info_hash})")
+                    skipped_identical += 1
+                    success = True
+                else:
+                    add_args = (
+                        content, series_data["save_path"], episode["torrent_id"],
+                        series_data["rename_enabled"], series_data["series_name"], series_data["season"]
+                    )
+                    if torrent and isinstance(content, bytes):
+                        # Новая версия уже скачанной раздачи заменяет старую с переиспользованием файлов на диске
+                        success, msg = await qb_manager.replace_torrent(torrent, *add_args, socketio=socketio)
+                    else:
+                        success, msg = await qb_manager.add_torrent(*add_args, socketio=socketio)
+                    socketio.emit('notification', {'message': msg, 'type': 'info'})
+                    added += success
                 if success:
-                    config.config["series"][series_url]["last_updated"] = episode["last_updated"]
+                    series_entry = config.config["series"][series_url]
+                    series_entry["last_updated"] = episode["last_updated"]
+                    if info_hash:
+                        series_entry.setdefault("info_hashes", {})[episode["torrent_id"]] = info_hash
                     config.save_config()
-                socketio.emit('notification', {'message': msg, 'type': 'info'})
                 progress += 1
             else:
                 logger.error(f"Не удалось получить содержимое торрента для {episode['torrent_url']}")
         elif series_data.get("rename_enabled", False) and torrent:
-            status = qb_manager.get_torrent_status(torrent.hash)
-            if status and status["completed"]:
-                await qb_manager.rename_torrent_files(torrent.hash, series_data["save_path"], series_data["series_name"], series_data["season"], episode["torrent_id"], socketio)
-                socketio.emit('status_update', {'series_url': series_url, 'status': 'Переименование завершено', 'progress': progress, 'total': total_steps})
-    logger.info(f"Завершено сканирование для {series_url}")
-    socketio.emit('status_update', {'series_url': series_url, 'status': 'Завершено', 'progress': total_steps, 'total': total_steps})
+            # Переименование выполняет фоновая очередь, как только загрузка завершится
+            auth_manager.rename_queue.enqueue(torrent.hash, series_data["save_path"], series_data["series_name"], series_data["season"], episode["torrent_id"])
+    await record_snapshot(series_url, qb_manager, episodes, socketio)
+    logger.info(f"Завершено сканирование для {series_url}: добавлено {added}, без изменений {skipped_identical}")
+    status = f'Завершено (без изменений: {skipped_identical})' if skipped_identical else 'Завершено'
+    socketio.emit('status_update', {'series_url': series_url, 'status': status, 'progress': total_steps, 'total': total_steps})
+    return {"added": added, "skipped_identical": skipped_identical}
 
-def run_scan_series(series_url, socketio, auth_manager, config):
+async def skip_unchanged_rutracker(series_urls, rutracker_api, torrent_index):
+    """Убирает из списка темы RuTracker, чей info_hash совпадает с торрентом в qBittorrent.
+
+    Данные всех тем запрашиваются пакетно, поэтому страницы открываются только у изменившихся раздач.
+    """
+    topics = {url: rutracker_topic_id(url) for url in series_urls if get_series_domain(url) == "rutracker.org"}
+    topics = {url: topic_id for url, topic_id in topics.items() if topic_id}
+    if not topics:
+        return series_urls
     try:
-        logger.info(f"Запуск сканирования в потоке для {series_url}")
-        asyncio.run(scan_series(series_url, socketio, auth_manager, config))
+        info_hashes = await rutracker_api.get_info_hashes(sorted(set(topics.values())))
     except Exception as e:
-        logger.error(f"Ошибка в потоке сканирования для {series_url}: {str(e)}", exc_info=True)
+        logger.error(f"Ошибка пакетной проверки тем RuTracker: {e}, сканируются все темы")
+        return series_urls
+    unchanged = set()
+    for series_url, topic_id in topics.items():
+        torrent = torrent_index.get_by_tag(topic_id)
+        if torrent and info_hashes.get(topic_id) == torrent.hash.lower():
+            unchanged.add(series_url)
+    logger.info(f"RuTracker: изменилось {len(topics) - len(unchanged)} из {len(topics)} тем")
+    return [url for url in series_urls if url not in unchanged]
+
+async def refresh_snapshot(series_url, socketio, auth_manager, config):
+    """Обновляет снимок сериала для окна статуса: только чтение трекера и qBittorrent, без добавления торрентов.
+
+    Выполняется общей очередью сканирования (ScanQueue.enqueue(..., refresh_only=True)), чтобы соблюдать лимиты доменов.
+    """
+    series_data = find_series_data(series_url, config)
+    scraper = auth_manager.get_scraper(series_url)
+    if not series_data or not scraper:
+        raise Exception("Сериал или парсер не найден")
+    episodes = await scraper.get_episodes(series_url, quality=series_data.get("quality"))
+    logger.info(f"Снимок {series_url} обновлён: {len(episodes)} эпизодов")
+    qb_manager = auth_manager.get_qb_manager() if auth_manager.get_qb_client() else None
+    await record_snapshot(series_url, qb_manager, episodes, socketio)
 
 async def monitor_task(socketio, auth_manager, config):
     try:
-        series = config.get("series", {})
+        series = list(config.get("series", {}))
         logger.info(f"Запуск мониторинга для {len(series)} сериалов")
+        started = time.monotonic()
+        scan_urls = []
         for series_url in series:
             scraper = auth_manager.get_scraper(series_url)
             if scraper:
-                await scan_series(series_url, socketio, auth_manager, config)
+                scan_urls.append(series_url)
             else:
                 logger.error(f"Парсер не найден для {series_url}")
-        logger.info("Мониторинг завершён")
+        # Если заданы ленты трекеров, сканируются только обновлённые в них темы
+        try:
+            scan_urls = await auth_manager.feed_poller.select_series(scan_urls)
+        except Exception as e:
+            logger.error(f"Ошибка опроса лент трекеров: {e}, сканируются все сериалы")
+        # Один снимок торрентов qBittorrent на весь цикл вместо полного списка на каждый сериал
+        torrent_index = None
+        if auth_manager.get_qb_client():
+            try:
+                torrent_index = await auth_manager.get_qb_manager().get_torrent_index()
+                logger.info(f"Снимок qBittorrent: {len(torrent_index)} торрентов")
+            except Exception as e:
+                logger.error(f"Ошибка получения списка торрентов qBittorrent: {e}")
+        if torrent_index is not None:
+            changed_urls = await skip_unchanged_rutracker(scan_urls, auth_manager.rutracker_api, torrent_index)
+            # Раздача не изменилась, значит обновление из ленты уже учтено
+            for series_url in set(scan_urls) - set(changed_urls):
+                auth_manager.feed_poller.mark_scanned(series_url)
+            scan_urls = changed_urls
+        # Сканирование выполняет общая очередь: сериалы, уже запущенные вручную, повторно не ставятся
+        futures = [auth_manager.scan_queue.enqueue(url, torrent_index=torrent_index)[0] for url in scan_urls]
+        results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+        errors = 0
+        added = 0
+        skipped_identical = 0
+        for series_url, result in zip(scan_urls, results):
+            if isinstance(result, Exception):
+                errors += 1
+            elif result:
+                added += result["added"]
+                skipped_identical += result["skipped_identical"]
+                auth_manager.feed_poller.mark_scanned(series_url)
+        elapsed = time.monotonic() - started
+        logger.info(f"Мониторинг завершён за {elapsed:.1f} с: просканировано {len(scan_urls)} сериалов, добавлено {added}, без изменений {skipped_identical}, ошибок: {errors}")
+        socketio.emit('notification', {'message': f'Мониторинг завершён за {elapsed:.1f} с ({len(scan_urls)} сериалов, добавлено {added}, без изменений {skipped_identical})', 'type': 'info'})
     except Exception as e:
         logger.error(f"Ошибка в monitor_task: {str(e)}", exc_info=True)
 
+def run_monitor_task(socketio, auth_manager, config):
+    """Запуск цикла мониторинга из потока планировщика в общем цикле событий приложения."""
+    get_event_loop_service().run(monitor_task(socketio, auth_manager, config))
+
 def setup_scheduler(socketio, auth_manager, config):
     scheduler.add_job(
-        lambda: asyncio.run(monitor_task(socketio, auth_manager, config)),
+        lambda: run_monitor_task(socketio, auth_manager, config),
         'interval',
         minutes=config.get("scan_interval", 30),
         id='monitor_task'
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+import uuid
+import logging
+from typing import Dict, Optional
+from event_loop import get_event_loop_service
+from scan_snapshots import collect_episode_status
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREVIEW_WORKERS = 2
+DEFAULT_PREVIEW_CACHE_TTL = 300  # Секунды, в течение которых готовый предпросмотр URL отдаётся повторно
+
+async def build_scan_preview(auth_manager, series_url: str) -> dict:
+    """Предпросмотр раздачи для окна добавления: названия, эпизоды и их состояние в qBittorrent."""
+    scraper = auth_manager.get_scraper(series_url)
+    result = await scraper.get_episodes(series_url)
+    if not result:
+        raise Exception("Эпизоды не найдены")
+
+    torrent_ids = [ep["torrent_id"] for ep in result]
+    quality_options = [{"quality": ep.get("quality", "N/A")} for ep in result] if any("quality" in ep and ep["quality"] != "N/A" for ep in result) else []
+    names = result[0].get("names", [result[0]["name"]]) if "names" in result[0] else [result[0]["name"]]
+    episode_torrents, statuses = {}, {}
+    if auth_manager.get_qb_client():
+        episode_torrents, statuses = await collect_episode_status(auth_manager.get_qb_manager(), result)
+    status_data = {
+        "episodes": [
+            {
+                "name": ep["name"],
+                "episode_name": ep.get("episode_name", ep["name"]),
+                "torrent_id": ep["torrent_id"],
+                "quality": ep.get("quality", "N/A"),
+                "last_updated": ep.get("last_updated", ""),
+                "status": statuses[episode_torrents[ep["torrent_id"]].hash]["state"]
+                          if episode_torrents.get(ep["torrent_id"]) and episode_torrents[ep["torrent_id"]].hash in statuses
+                          else "Есть на сайте"
+            } for ep in result
+        ]
+    }
+    preview = {
+        "name": result[0]["name"],
+        "names": names,
+        "torrent_ids": torrent_ids,
+        "status_data": status_data
+    }
+    if quality_options:
+        preview["quality_options"] = quality_options
+    return preview
+
+class PreviewJobs:
+    """Задания предпросмотра URL из окна добавления сериала.
+
+    Запрос сразу получает ID задания, а разбор страницы выполняется в общем цикле событий,
+    не больше workers заданий одновременно, поэтому медленный трекер не занимает потоки Flask.
+    Одинаковые URL, которые уже разбираются, не запускаются повторно, а готовый результат
+    отдаётся из памяти result_ttl секунд. Итог задания приходит событием Socket.IO
+    "scan_url_result" и доступен по ID.
+    """
+    def __init__(self, auth_manager, socketio, workers: int = DEFAULT_PREVIEW_WORKERS, result_ttl: float = DEFAULT_PREVIEW_CACHE_TTL):
+        self.auth_manager = auth_manager
+        self.socketio = socketio
+        self.result_ttl = result_ttl
+        self.jobs: Dict[str, dict] = {}
+        self.by_url: Dict[str, str] = {}  # URL -> ID выполняющегося или готового задания
+        self._lock = threading.Lock()
+        self._slots = asyncio.Semaphore(max(1, workers))
+
+    @staticmethod
+    def _public(job: dict) -> dict:
+        return {key: value for key, value in job.items() if key != "finished_at"}
+
+    def _prune(self):
+        expired_before = time.monotonic() - self.result_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job.get("finished_at") and job["finished_at"] < expired_before:
+                del self.jobs[job_id]
+                if self.by_url.get(job["series_url"]) == job_id:
+                    del self.by_url[job["series_url"]]
+
+    def submit(self, series_url: str) -> dict:
+        """Задание для URL: уже выполняющееся, готовое из кэша или новое в очереди."""
+        with self._lock:
+            self._prune()
+            job_id = self.by_url.get(series_url)
+            if job_id:
+                logger.info(f"Предпросмотр {series_url}: используется задание {job_id} ({self.jobs[job_id]['status']})")
+                return self._public(self.jobs[job_id])
+            job = {"job_id": uuid.uuid4().hex, "series_url": series_url, "status": "queued"}
+            self.jobs[job["job_id"]] = job
+            self.by_url[series_url] = job["job_id"]
+            get_event_loop_service().submit(self._run(job))
+            return self._public(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            self._prune()
+            job = self.jobs.get(job_id)
+            return self._public(job) if job else None
+
+    async def _run(self, job: dict):
+        try:
+            async with self._slots:
+                with self._lock:
+                    job["status"] = "running"
+                result = await build_scan_preview(self.auth_manager, job["series_url"])
+            with self._lock:
+                job.update(status="done", result=result, finished_at=time.monotonic())
+            logger.info(f"Предпросмотр {job['series_url']} готов: {len(result['torrent_ids'])} эпизодов")
+        except Exception as e:
+            logger.error(f"Ошибка при сканировании URL {job['series_url']}: {e}")
+            with self._lock:
+                job.update(status="error", error=str(e), finished_at=time.monotonic())
+                # Ошибка не кэшируется: следующий запрос этого URL разберёт страницу заново
+                if self.by_url.get(job["series_url"]) == job["job_id"]:
+                    del self.by_url[job["series_url"]]
+        with self._lock:
+            public = self._public(job)
+        self.socketio.emit('scan_url_result', public)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": sum(job["status"] == "queued" for job in self.jobs.values()),
+                "running": sum(job["status"] == "running" for job in self.jobs.values()),
+                "cached": sum(job["status"] == "done" for job in self.jobs.values())
+            }
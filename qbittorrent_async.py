@@ -0,0 +1,152 @@
+import aiohttp
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class QBittorrentLoginError(Exception):
+    pass
+
+class QBittorrentAPIError(Exception):
+    pass
+
+class TorrentRecord(dict):
+    """Ответ WebUI API с доступом к полям как к атрибутам (t.hash, t.tags, f.name, ...)."""
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+class AsyncQBittorrentClient:
+    """Асинхронный клиент WebUI API qBittorrent на aiohttp.
+
+    Соединения переиспользуются через пул keep-alive, у каждого запроса есть таймаут,
+    при ответе 403 (истёк SID) клиент один раз перелогинивается и повторяет запрос.
+    Сессия aiohttp создаётся при первом запросе в цикле событий приложения.
+    """
+    def __init__(self, host: str, username: str, password: str, timeout: float = 30, pool_size: int = 10, verify_ssl: bool = True):
+        self.host = host.rstrip("/")
+        self.username = username
+        self.password = password
+        self.verify_ssl = verify_ssl
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._sid: Optional[str] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ssl=self.verify_ssl),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                cookie_jar=aiohttp.DummyCookieJar()
+            )
+        return self._session
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Referer": self.host}
+        if self._sid:
+            headers["Cookie"] = f"SID={self._sid}"
+        return headers
+
+    async def login(self):
+        session = self._get_session()
+        async with session.post(
+            f"{self.host}/api/v2/auth/login",
+            data={"username": self.username, "password": self.password},
+            headers={"Referer": self.host}
+        ) as response:
+            text = await response.text()
+            if response.status == 403:
+                raise QBittorrentLoginError("IP заблокирован после неудачных попыток входа")
+            if response.status != 200 or text.strip() != "Ok.":
+                raise QBittorrentLoginError("Неверный логин/пароль")
+            sid = response.cookies.get("SID")
+            self._sid = sid.value if sid else None
+
+    async def _request(self, method: str, path: str, params: dict = None, data: dict = None, files: dict = None):
+        for attempt in range(2):
+            form = None
+            if data is not None or files is not None:
+                form = aiohttp.FormData()
+                for key, value in (data or {}).items():
+                    form.add_field(key, value)
+                for key, (filename, content) in (files or {}).items():
+                    form.add_field(key, content, filename=filename, content_type="application/x-bittorrent")
+            session = self._get_session()
+            async with session.request(method, f"{self.host}/api/v2/{path}", params=params, data=form, headers=self._headers()) as response:
+                if response.status == 403 and attempt == 0:
+                    logger.info("Сессия qBittorrent истекла, повторный вход")
+                    await self.login()
+                    continue
+                if response.status >= 400:
+                    raise QBittorrentAPIError(f"{path}: HTTP {response.status} {await response.text()}")
+                if response.content_type == "application/json":
+                    return await response.json()
+                return await response.text()
+
+    async def app_version(self) -> str:
+        return await self._request("GET", "app/version")
+
+    async def torrents_info(self, torrent_hashes: str | List[str] = None) -> List[TorrentRecord]:
+        params = {}
+        if torrent_hashes:
+            params["hashes"] = torrent_hashes if isinstance(torrent_hashes, str) else "|".join(torrent_hashes)
+        return [TorrentRecord(t) for t in await self._request("GET", "torrents/info", params=params)]
+
+    async def torrents_files(self, torrent_hash: str) -> List[TorrentRecord]:
+        return [TorrentRecord(f) for f in await self._request("GET", "torrents/files", params={"hash": torrent_hash})]
+
+    async def torrents_add(self, torrent_files: bytes = None, urls: str = None, save_path: str = None, category: str = "",
+                           is_paused: bool = False, use_auto_torrent_management: bool = False,
+                           content_layout: str = "Original", tags: List[str] = None):
+        paused = "true" if is_paused else "false"
+        data = {
+            "category": category,
+            # qBittorrent 5 переименовал paused в stopped, отправляем оба
+            "paused": paused,
+            "stopped": paused,
+            "autoTMM": "true" if use_auto_torrent_management else "false",
+            "contentLayout": content_layout,
+            "tags": ",".join(tags or [])
+        }
+        if save_path:
+            data["savepath"] = save_path
+        if urls:
+            data["urls"] = urls
+        files = {"torrents": ("upload.torrent", torrent_files)} if torrent_files else None
+        result = await self._request("POST", "torrents/add", data=data, files=files)
+        if isinstance(result, str) and result.strip() == "Fails.":
+            raise QBittorrentAPIError("qBittorrent отклонил торрент")
+        return result
+
+    async def torrents_rename_file(self, torrent_hash: str, old_path: str, new_path: str):
+        await self._request("POST", "torrents/renameFile", data={"hash": torrent_hash, "oldPath": old_path, "newPath": new_path})
+
+    async def torrents_rename_folder(self, torrent_hash: str, old_path: str, new_path: str):
+        await self._request("POST", "torrents/renameFolder", data={"hash": torrent_hash, "oldPath": old_path, "newPath": new_path})
+
+    async def torrents_delete(self, delete_files: bool, torrent_hashes: str | List[str]):
+        hashes = torrent_hashes if isinstance(torrent_hashes, str) else "|".join(torrent_hashes)
+        await self._request("POST", "torrents/delete", data={"hashes": hashes, "deleteFiles": "true" if delete_files else "false"})
+
+    async def torrents_recheck(self, torrent_hashes: str | List[str]):
+        hashes = torrent_hashes if isinstance(torrent_hashes, str) else "|".join(torrent_hashes)
+        await self._request("POST", "torrents/recheck", data={"hashes": hashes})
+
+    async def torrents_start(self, torrent_hashes: str | List[str]):
+        hashes = torrent_hashes if isinstance(torrent_hashes, str) else "|".join(torrent_hashes)
+        try:
+            await self._request("POST", "torrents/start", data={"hashes": hashes})
+        except QBittorrentAPIError:
+            # До qBittorrent 5 запуск назывался resume
+            await self._request("POST", "torrents/resume", data={"hashes": hashes})
+
+    async def sync_maindata(self, rid: int = 0) -> dict:
+        return await self._request("GET", "sync/maindata", params={"rid": rid})
+
+    async def close(self):
+        session, self._session = self._session, None
+        if session:
+            await session.close()
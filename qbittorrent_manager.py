@@ -1,10 +1,10 @@
 import asyncio
-import re
-from qbittorrentapi import Client
+from qbittorrent_async import AsyncQBittorrentClient
 import logging
 import logging.handlers
 from typing import List, Dict, Optional, Tuple
-import os
+from torrent_utils import get_infohash, torrent_layout
+import rename_engine
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,16 +16,129 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Адресный поиск только что добавленного торрента: первая пауза и общий лимит ожидания, секунды
+ADD_POLL_INITIAL_DELAY = 0.1
+ADD_POLL_TIMEOUT = 5.0
+
+STATUS_MAP = {
+    'downloading': 'Загружается',
+    'uploading': 'Скачан',
+    'stalledDL': 'В очереди',
+    'stalledUP': 'Скачан',
+    'pausedDL': 'Пауза',
+    'pausedUP': 'Скачан (Пауза)',
+    'queuedDL': 'В очереди',
+    'queuedUP': 'Скачан (В очереди)',
+    'checkingDL': 'Проверка',
+    'checkingUP': 'Проверка',
+    'error': 'Ошибка'
+}
+
+def split_tags(tags: str) -> List[str]:
+    """Разбивает строку тегов qBittorrent ("a, b") на отдельные теги."""
+    return [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else []
+
+def is_torrent_completed(torrent) -> bool:
+    return torrent.progress == 1.0 or torrent.state in ["uploading", "stalledUP"]
+
+def split_root(path: str) -> Tuple[str, str]:
+    """Корневая папка торрента и путь внутри неё; у однофайлового торрента папки нет."""
+    root, sep, inner = path.partition("/")
+    return (root, inner) if sep else ("", path)
+
+def map_reused_files(new_files: List[Tuple[str, int]], old_files: List[Tuple[str, int]], series_name: str, season: str) -> Dict[str, str]:
+    """Файлы новой раздачи, которые уже лежат на диске у старой: путь в новом торренте -> текущее имя в старом.
+
+    Пути сравниваются внутри корневой папки: перевыпуск сезона часто меняет её название
+    (например, диапазон серий). Файл считается тем же, если совпадает размер, а имя
+    совпадает с исходным или с тем, что получилось бы после переименования по шаблону.
+    """
+    old_by_inner = {split_root(name)[1]: (name, size) for name, size in old_files}
+    used = set()
+    mapping = {}
+    for path, size in new_files:
+        inner = split_root(path)[1]
+        for candidate in (inner, rename_engine.get_new_filename(inner, series_name, season)):
+            old = old_by_inner.get(candidate)
+            if old and old[0] not in used and old[1] == size:
+                mapping[path] = old[0]
+                used.add(old[0])
+                break
+    return mapping
+
+class TorrentIndex:
+    """Снимок списка торрентов qBittorrent с индексами по точному тегу и по хэшу."""
+    def __init__(self, torrents=None):
+        self.by_hash = {}
+        self.by_tag = {}
+        for torrent in torrents or []:
+            self.by_hash[torrent.hash] = torrent
+            for tag in split_tags(torrent.tags):
+                self.by_tag.setdefault(tag, torrent)
+
+    def get_by_tag(self, tag: str):
+        return self.by_tag.get(tag)
+
+    def get_by_hash(self, torrent_hash: str):
+        return self.by_hash.get(torrent_hash)
+
+    def __iter__(self):
+        return iter(self.by_hash.values())
+
+    def __len__(self):
+        return len(self.by_hash)
+
+class FileNameIndex:
+    """Имена файлов торрентов одного каталога: имя файла -> хэши торрентов, в которых оно есть."""
+    def __init__(self):
+        self.by_name: Dict[str, set] = {}
+        self.by_hash: Dict[str, List[str]] = {}
+
+    def add(self, torrent_hash: str, names: List[str]):
+        self.by_hash[torrent_hash] = names
+        for name in names:
+            self.by_name.setdefault(name, set()).add(torrent_hash)
+
+    def get(self, name: str) -> List[str]:
+        return list(self.by_name.get(name, ()))
+
+    def remove(self, torrent_hash: str):
+        for name in self.by_hash.pop(torrent_hash, []):
+            hashes = self.by_name.get(name)
+            if hashes:
+                hashes.discard(torrent_hash)
+                if not hashes:
+                    del self.by_name[name]
+
 class QBittorrentManager:
-    def __init__(self, client: Client):
+    def __init__(self, client: AsyncQBittorrentClient, mirror=None, rename_queue=None):
         self.client = client
+        self.mirror = mirror
+        self.rename_queue = rename_queue
+
+    def _use_mirror(self) -> bool:
+        return self.mirror is not None and self.mirror.is_ready()
+
+    async def get_torrent_index(self) -> TorrentIndex:
+        """Индекс торрентов из локального зеркала, либо один полный запрос списка, если зеркало не готово."""
+        if self._use_mirror():
+            return self.mirror.snapshot()
+        if not self.client:
+            return TorrentIndex()
+        return TorrentIndex(await self.client.torrents_info())
+
+    async def get_torrent(self, torrent_hash: str):
+        if self._use_mirror():
+            return self.mirror.get(torrent_hash)
+        torrents = await self.client.torrents_info(torrent_hashes=torrent_hash)
+        return torrents[0] if torrents else None
 
     async def add_torrent(self, torrent_content: bytes | str, save_path: str, torrent_id: str, rename_enabled: bool, series_name: str, season: str, socketio=None) -> Tuple[bool, str]:
         if not self.client:
             return False, "Нет подключения к qBittorrent"
         try:
             if isinstance(torrent_content, bytes):
-                self.client.torrents_add(
+                await self.client.torrents_add(
                     torrent_files=torrent_content,
                     save_path=save_path,
                     category="",
@@ -35,7 +148,7 @@ class QBittorrentManager:
                     tags=[torrent_id]
                 )
             elif isinstance(torrent_content, str) and torrent_content.startswith("magnet:"):
-                self.client.torrents_add(
+                await self.client.torrents_add(
                     urls=torrent_content,
                     save_path=save_path,
                     category="",
@@ -47,99 +160,156 @@ class QBittorrentManager:
             else:
                 return False, "Неподдерживаемый формат торрента"
             logger.info(f"Добавлен торрент с ID {torrent_id} в {save_path}")
-            await asyncio.sleep(2)
-            torrents = self.client.torrents_info()
-            torrent_hash = next((t.hash for t in torrents if torrent_id in t.tags), None)
+            torrent_hash = await self.wait_for_torrent(get_infohash(torrent_content), torrent_id)
             if not torrent_hash:
                 return True, f"Торрент добавлен, но не найден в списке (ID: {torrent_id})"
-            if rename_enabled:
-                await self.rename_torrent_files(torrent_hash, save_path, series_name, season, torrent_id, socketio)
+            if rename_enabled and self.rename_queue is not None:
+                # Переименование выполнится в фоне после завершения загрузки
+                self.rename_queue.enqueue(torrent_hash, save_path, series_name, season, torrent_id)
             return True, f"Торрент добавлен: {series_name} в {save_path}"
         except Exception as e:
             logger.error(f"Ошибка добавления торрента {torrent_id}: {e}")
             return False, f"Ошибка: {e}"
 
-    async def wait_for_completion(self, torrent_hash: str):
+    async def replace_torrent(self, old_torrent, torrent_content: bytes, save_path: str, torrent_id: str, rename_enabled: bool, series_name: str, season: str, socketio=None) -> Tuple[bool, str]:
+        """Заменяет торрент новой версией раздачи, переиспользуя уже скачанные файлы.
+
+        Новый торрент добавляется на паузе в каталог старого, его файлы получают текущие
+        имена совпавших файлов старого торрента, а корневая папка — имя папки старого. Старый
+        торрент удаляется без данных, после перепроверки новый докачивает только новые и
+        изменённые файлы. Если общих файлов нет, торрент добавляется обычным способом; при
+        ошибке до удаления старого торрента новый удаляется, и остаётся старый.
+        """
+        if not self.client:
+            return False, "Нет подключения к qBittorrent"
+        try:
+            # Раскладку кусков старого торрента сравнивать не нужно: перепроверка считает хэши
+            # новых кусков по данным на диске, и куски на стыке с изменёнными файлами просто докачаются
+            _, new_files = torrent_layout(torrent_content)
+            old_files = await self.client.torrents_files(torrent_hash=old_torrent.hash)
+            file_mapping = map_reused_files(new_files, [(f.name, f.size) for f in old_files], series_name, season)
+        except Exception as e:
+            logger.warning(f"Не удалось сравнить файлы раздачи {torrent_id}: {e}, обычное добавление")
+            file_mapping = {}
+        if not file_mapping:
+            return await self.add_torrent(torrent_content, save_path, torrent_id, rename_enabled, series_name, season, socketio=socketio)
+
+        new_hash = get_infohash(torrent_content)
+        added = replaced = False
+        try:
+            # Данные уже лежат в каталоге старого торрента
+            save_path = old_torrent.save_path or save_path
+            await self.client.torrents_add(
+                torrent_files=torrent_content,
+                save_path=save_path,
+                category="",
+                is_paused=True,
+                use_auto_torrent_management=False,
+                content_layout="Original",
+                tags=[torrent_id]
+            )
+            added = True
+            torrent_hash = await self.wait_for_torrent(new_hash, torrent_id)
+            if not torrent_hash:
+                raise Exception("новый торрент не появился в списке qBittorrent")
+            new_root = split_root(new_files[0][0])[0]
+            old_root = split_root(next(iter(file_mapping.values())))[0]
+            if new_root and old_root and new_root != old_root:
+                # Новые серии тоже окажутся в папке со старыми
+                await self.client.torrents_rename_folder(torrent_hash=torrent_hash, old_path=new_root, new_path=old_root)
+                file_mapping = {f"{old_root}/{split_root(path)[1]}": old_name for path, old_name in file_mapping.items()}
+            for new_path, old_name in file_mapping.items():
+                if new_path != old_name:
+                    await self.client.torrents_rename_file(torrent_hash=torrent_hash, old_path=new_path, new_path=old_name)
+            await self.client.torrents_delete(delete_files=False, torrent_hashes=old_torrent.hash)
+            replaced = True
+            await self.client.torrents_recheck(torrent_hash)
+            await self.client.torrents_start(torrent_hash)
+            logger.info(f"Торрент {torrent_id} заменён новой версией: переиспользовано файлов {len(file_mapping)} из {len(new_files)}")
+            if rename_enabled and self.rename_queue is not None:
+                self.rename_queue.enqueue(torrent_hash, save_path, series_name, season, torrent_id)
+            return True, f"Торрент обновлён: {series_name}, новых файлов {len(new_files) - len(file_mapping)}"
+        except Exception as e:
+            logger.error(f"Ошибка замены торрента {torrent_id}: {e}")
+            if added and not replaced and new_hash:
+                # Иначе под тегом останутся два торрента, и следующие циклы будут снова добавлять тот же
+                try:
+                    await self.client.torrents_delete(delete_files=False, torrent_hashes=new_hash)
+                    logger.info(f"Новая версия торрента {torrent_id} удалена, старый торрент оставлен")
+                except Exception as cleanup_error:
+                    logger.error(f"Не удалось удалить новую версию торрента {torrent_id}: {cleanup_error}")
+            return False, f"Ошибка: {e}"
+
+    async def wait_for_torrent(self, torrent_hash: Optional[str], torrent_id: str) -> Optional[str]:
+        """Ждёт появления только что добавленного торрента адресным запросом по хэшу с нарастающей паузой."""
+        if not torrent_hash:
+            # Хэш не удалось вычислить локально: ищем по тегу после обновления списка
+            await asyncio.sleep(2)
+            if self.mirror is not None:
+                await self.mirror.refresh()
+            torrent = (await self.get_torrent_index()).get_by_tag(torrent_id)
+            return torrent.hash if torrent else None
+        delay = ADD_POLL_INITIAL_DELAY
+        waited = 0.0
         while True:
-            torrents = self.client.torrents_info(torrent_hashes=torrent_hash)
-            if not torrents:
-                logger.error(f"Торрент {torrent_hash} не найден")
-                return False
-            torrent = torrents[0]
-            if torrent.progress == 1.0 or torrent.state in ["uploading", "stalledUP"]:
-                logger.info(f"Торрент {torrent_hash} полностью загружен")
-                return True
-            await asyncio.sleep(10)
+            if await self.client.torrents_info(torrent_hashes=torrent_hash):
+                return torrent_hash
+            if waited >= ADD_POLL_TIMEOUT:
+                logger.warning(f"Торрент {torrent_hash} (ID {torrent_id}) не появился в qBittorrent за {waited:.1f} с")
+                return None
+            await asyncio.sleep(delay)
+            waited += delay
+            delay = min(delay * 2, 1.0)
 
     def get_new_filename(self, old_name: str, series_name: str, season: str) -> Optional[str]:
         """Генерирует новое имя файла с учётом нового паттерна, сохраняя расширение."""
-        patterns = [
-            r"(\d{2})\.\s*(.+?)(?:\s*\(.*\))?$",  # "01. Name..."
-            r".+\s+-\s+(\d{2})$",  # "Name - 06..."
-            r'Серия\s+(\d+)', r'Серии\s+(\d+)-(\d+)', r'\s(\d+)\s', r'_(\d+)_',
-            r'\[(\d+)\]', r'[eE](\d+)'
-        ]
-        resolution_patterns = [r'(720p)', r'(1080p)', r'(2160p)']
-
-        # Разделяем путь, имя файла и расширение
-        directory, filename = os.path.split(old_name)
-        base_name, extension = os.path.splitext(filename)
-
-        episode_num = None
-        for pattern in patterns:
-            match = re.search(pattern, base_name)
-            if match:
-                episode_num = match.group(1).zfill(2)
-                break
-    
-        resolution = ''
-        for res_pattern in resolution_patterns:
-            match = re.search(res_pattern, base_name, re.IGNORECASE)
-            if match:
-                resolution = f" {match.group(1)}"
-                break
-    
-        if episode_num:
-            # Формируем новое имя с расширением, если оно есть
-            new_name = f"{series_name} {season}e{episode_num}{resolution}{extension}"
-            return os.path.join(directory, new_name) if directory else new_name
-    
-        logger.warning(f"Не удалось извлечь номер эпизода из {old_name}")
-        return old_name  # Возвращаем исходное имя, если паттерн не найден
+        return rename_engine.get_new_filename(old_name, series_name, season)
+
+    async def build_file_index(self, torrent_index: TorrentIndex, save_path: str, exclude_hash: str = None) -> FileNameIndex:
+        """Один запрос списка файлов на каждый торрент в save_path на всю пачку переименований, запросы идут параллельно."""
+        torrents = [t for t in torrent_index if t.hash != exclude_hash and t.save_path == save_path]
+        files = await asyncio.gather(*(self.client.torrents_files(torrent_hash=t.hash) for t in torrents))
+        file_index = FileNameIndex()
+        for torrent, torrent_files in zip(torrents, files):
+            file_index.add(torrent.hash, [f.name for f in torrent_files])
+        return file_index
 
     async def rename_torrent_files(self, torrent_hash: str, save_path: str, series_name: str, season: str, torrent_id: str, socketio=None):
         if not self.client:
             raise Exception("Нет подключения к qBittorrent")
-        if not await self.wait_for_completion(torrent_hash):
-            raise Exception("Торрент не загружен полностью")
         try:
-            qb_torrents = self.client.torrents_info()
-            target_torrent = next((t for t in qb_torrents if t.hash == torrent_hash and torrent_id in t.tags), None)
+            qb_torrents = await self.get_torrent_index()
+            target_torrent = qb_torrents.get_by_hash(torrent_hash)
+            if target_torrent and torrent_id not in split_tags(target_torrent.tags):
+                target_torrent = None
             if not target_torrent:
                 logger.warning(f"Не найдено торрента с хэшем {torrent_hash} и ID {torrent_id}")
                 raise Exception(f"Торрент не найден или ID не совпадает")
+            if not is_torrent_completed(target_torrent):
+                raise Exception("Торрент не загружен полностью")
             
             logger.info(f"Выполняется переименование файлов торрента с хэшем {torrent_hash} и ID {torrent_id}")
-            files = self.client.torrents_files(torrent_hash=torrent_hash)
+            files = await self.client.torrents_files(torrent_hash=torrent_hash)
             if not files:
                 logger.warning(f"Нет файлов для переименования в торренте {torrent_hash}")
                 return
 
-            for file in files:
-                new_name = self.get_new_filename(file.name, series_name, season)
-                if new_name and file.name != new_name:
-                    for other_torrent in qb_torrents:
-                        if other_torrent.hash != torrent_hash and other_torrent.save_path == save_path:
-                            other_files = self.client.torrents_files(torrent_hash=other_torrent.hash)
-                            if any(of.name == new_name for of in other_files):
-                                self.client.torrents_delete(delete_files=True, torrent_hashes=other_torrent.hash)
-                                logger.info(f"Удалён старый торрент {other_torrent.name} для замены на {new_name}")
-                    self.client.torrents_rename_file(torrent_hash=torrent_hash, old_path=file.name, new_path=new_name)
-                    logger.info(f"Переименован: {file.name} -> {new_name}")
+            file_index = None
+            for old_name, new_name in rename_engine.plan_renames([f.name for f in files], series_name, season):
+                if new_name and old_name != new_name:
+                    if file_index is None:
+                        file_index = await self.build_file_index(qb_torrents, save_path, exclude_hash=torrent_hash)
+                    for other_hash in file_index.get(new_name):
+                        other_torrent = qb_torrents.get_by_hash(other_hash)
+                        await self.client.torrents_delete(delete_files=True, torrent_hashes=other_hash)
+                        file_index.remove(other_hash)
+                        logger.info(f"Удалён старый торрент {other_torrent.name} для замены на {new_name}")
+                    await self.client.torrents_rename_file(torrent_hash=torrent_hash, old_path=old_name, new_path=new_name)
+                    logger.info(f"Переименован: {old_name} -> {new_name}")
                     if socketio:
-                        socketio.emit('notification', {'message': f"Переименован: {file.name} -> {new_name}", 'type': 'info'})
+                        socketio.emit('notification', {'message': f"Переименован: {old_name} -> {new_name}", 'type': 'info'})
                 else:
-                    logger.info(f"Файл {file.name} не требует переименования или паттерн не найден")
+                    logger.info(f"Файл {old_name} не требует переименования или паттерн не найден")
         except Exception as e:
             logger.error(f"Ошибка при переименовании торрента {torrent_hash} с ID {torrent_id}: {str(e)}")
             raise
@@ -149,13 +319,11 @@ class QBittorrentManager:
             logger.error("Нет подключения к qBittorrent для получения файлов")
             return [{"current_name": "Ошибка", "new_name": "Нет подключения к qBittorrent"}]
         try:
-            qb_torrents = self.client.torrents_info()
+            qb_torrents = [t for t in await self.get_torrent_index() if t.save_path == save_path]
             files_list = []
-            for torrent in qb_torrents:
-                if torrent.save_path == save_path:
-                    files = self.client.torrents_files(torrent_hash=torrent.hash)
-                    for file in files:
-                        files_list.append({"current_name": file.name})
+            for files in await asyncio.gather(*(self.client.torrents_files(torrent_hash=t.hash) for t in qb_torrents)):
+                for file in files:
+                    files_list.append({"current_name": file.name})
             if not files_list:
                 logger.warning(f"Не найдено файлов для пути {save_path}")
                 return [{"current_name": "Нет файлов", "new_name": "Торренты не найдены"}]
@@ -164,31 +332,24 @@ class QBittorrentManager:
             logger.error(f"Ошибка при получении файлов торрентов: {e}")
             return [{"current_name": "Ошибка", "new_name": str(e)}]
 
-    def get_torrent_status(self, torrent_hash: str) -> Optional[Dict[str, str]]:
-        if not self.client:
-            return None
+    async def get_torrent_status(self, torrent_hash: str) -> Optional[Dict[str, str]]:
+        return (await self.get_torrent_statuses([torrent_hash])).get(torrent_hash)
+
+    async def get_torrent_statuses(self, torrent_hashes: List[str]) -> Dict[str, Dict[str, str]]:
+        """Статусы сразу нескольких торрентов: из зеркала или одним запросом torrents_info."""
+        if not self.client or not torrent_hashes:
+            return {}
         try:
-            torrents = self.client.torrents_info(torrent_hashes=torrent_hash)
-            if not torrents:
-                return None
-            torrent = torrents[0]
-            status_map = {
-                'downloading': 'Загружается',
-                'uploading': 'Скачан',
-                'stalledDL': 'В очереди',
-                'stalledUP': 'Скачан',
-                'pausedDL': 'Пауза',
-                'pausedUP': 'Скачан (Пауза)',
-                'queuedDL': 'В очереди',
-                'queuedUP': 'Скачан (В очереди)',
-                'checkingDL': 'Проверка',
-                'checkingUP': 'Проверка',
-                'error': 'Ошибка'
-            }
+            if self._use_mirror():
+                torrents = [self.mirror.get(torrent_hash) for torrent_hash in torrent_hashes]
+            else:
+                torrents = await self.client.torrents_info(torrent_hashes=list(set(torrent_hashes)))
             return {
-                "state": status_map.get(torrent.state, "Неизвестно"),
-                "completed": torrent.progress == 1.0 or torrent.state in ["uploading", "stalledUP"]
+                torrent.hash: {
+                    "state": STATUS_MAP.get(torrent.state, "Неизвестно"),
+                    "completed": is_torrent_completed(torrent)
+                } for torrent in torrents if torrent
             }
         except Exception as e:
-            logger.error(f"Ошибка при проверке статуса торрента {torrent_hash}: {e}")
-            return None
\ No newline at end of file
+            logger.error(f"Ошибка при проверке статуса торрентов {', '.join(torrent_hashes)}: {e}")
+            return {}
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import logging
+from typing import Dict, Optional
+from event_loop import get_event_loop_service
+from qbittorrent_async import TorrentRecord
+from qbittorrent_manager import TorrentIndex
+
+logger = logging.getLogger(__name__)
+
+class QBittorrentMirror:
+    """Локальная копия списка торрентов qBittorrent, обновляемая инкрементально через sync/maindata.
+
+    Фоновая задача в цикле событий приложения опрашивает qBittorrent с курсором rid и применяет только изменения,
+    поэтому чтения списка и статусов торрентов не делают запросов к qBittorrent.
+    """
+    def __init__(self, client, interval: float = 2.0):
+        self.client = client
+        self.interval = interval
+        self.rid = 0
+        self.torrents: Dict[str, TorrentRecord] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+        self._refresh_lock = asyncio.Lock()
+        self._task = None
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._stop_event.clear()
+        self._task = get_event_loop_service().submit(self._poll_forever())
+        logger.info("Зеркало qBittorrent запущено")
+
+    def stop(self):
+        self._stop_event.set()
+        logger.info("Зеркало qBittorrent остановлено")
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def _poll_forever(self):
+        while not self._stop_event.is_set():
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка синхронизации с qBittorrent: {e}")
+                # После ошибки запрашиваем полный снимок заново
+                self.rid = 0
+                self._ready.clear()
+            await asyncio.sleep(self.interval)
+        await self.client.close()
+
+    async def refresh(self):
+        """Запрашивает изменения с последнего rid и применяет их к локальной таблице.
+
+        Вызовы выполняются по очереди: внеочередное обновление (например, при ожидании
+        добавленного торрента) не пересекается с фоновым опросом и не откатывает rid.
+        """
+        async with self._refresh_lock:
+            self.apply(await self.client.sync_maindata(rid=self.rid))
+
+    def apply(self, data):
+        with self._lock:
+            if not data.get("full_update") and data.get("rid", self.rid + 1) <= self.rid:
+                logger.debug(f"Устаревший ответ sync/maindata (rid {data.get('rid')} при текущем {self.rid}) пропущен")
+                return
+            if data.get("full_update"):
+                self.torrents = {}
+            for torrent_hash, fields in (data.get("torrents") or {}).items():
+                # Записи не изменяются на месте: уже выданные снимки остаются согласованными
+                self.torrents[torrent_hash] = TorrentRecord({**self.torrents.get(torrent_hash, {}), **fields, "hash": torrent_hash})
+            for torrent_hash in data.get("torrents_removed") or []:
+                self.torrents.pop(torrent_hash, None)
+            self.rid = data.get("rid", self.rid)
+        self._ready.set()
+
+    def snapshot(self) -> TorrentIndex:
+        with self._lock:
+            return TorrentIndex(list(self.torrents.values()))
+
+    def get(self, torrent_hash: str) -> Optional[TorrentRecord]:
+        with self._lock:
+            return self.torrents.get(torrent_hash)
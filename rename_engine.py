@@ -0,0 +1,56 @@
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Паттерны номера эпизода в порядке приоритета: срабатывает первый, нашедший совпадение
+EPISODE_PATTERNS = [
+    r"(?P<ep0>\d{2})\.\s*.+?(?:\s*\(.*\))?$",  # "01. Name..."
+    r".+\s+-\s+(?P<ep1>\d{2})$",  # "Name - 06..."
+    r"Серия\s+(?P<ep2>\d+)",
+    r"Серии\s+(?P<ep3>\d+)-\d+",
+    r"\s(?P<ep4>\d+)\s",
+    r"_(?P<ep5>\d+)_",
+    r"\[(?P<ep6>\d+)\]",
+    r"[eE](?P<ep7>\d+)"
+]
+RESOLUTION_PATTERNS = [r"(?P<res0>720p)", r"(?P<res1>1080p)", r"(?P<res2>2160p)"]
+
+def _compile_prioritized(patterns: List[str], flags: int = 0) -> re.Pattern:
+    """Собирает паттерны в одно выражение с сохранением приоритета.
+
+    Каждая альтернатива — опережающая проверка от начала строки, поэтому первая
+    подходящая альтернатива находит то же самое совпадение, что и отдельный re.search.
+    """
+    return re.compile("^(?:" + "|".join(f"(?=.*?{pattern})" for pattern in patterns) + ")", flags | re.DOTALL)
+
+EPISODE_RE = _compile_prioritized(EPISODE_PATTERNS)
+RESOLUTION_RE = _compile_prioritized(RESOLUTION_PATTERNS, re.IGNORECASE)
+
+def _first_group(match: Optional[re.Match]) -> Optional[str]:
+    if not match:
+        return None
+    return next((value for value in match.groupdict().values() if value is not None), None)
+
+@lru_cache(maxsize=8192)
+def get_new_filename(old_name: str, series_name: str, season: str) -> str:
+    """Новое имя файла "<Название> <Сезон>e<Номер> <Качество>.<расш>" или исходное, если номер не найден."""
+    directory, filename = os.path.split(old_name)
+    base_name, extension = os.path.splitext(filename)
+
+    episode_num = _first_group(EPISODE_RE.match(base_name))
+    if not episode_num:
+        logger.warning(f"Не удалось извлечь номер эпизода из {old_name}")
+        return old_name
+
+    resolution = _first_group(RESOLUTION_RE.match(base_name))
+    resolution = f" {resolution}" if resolution else ""
+    new_name = f"{series_name} {season}e{episode_num.zfill(2)}{resolution}{extension}"
+    return os.path.join(directory, new_name) if directory else new_name
+
+def plan_renames(file_names: Iterable[str], series_name: str, season: str) -> List[Tuple[str, str]]:
+    """План переименования для целого списка файлов за один проход: пары (текущее имя, новое имя)."""
+    return [(name, get_new_filename(name, series_name, season)) for name in file_names]
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from event_loop import get_event_loop_service
+from qbittorrent_manager import is_torrent_completed
+from scan_snapshots import get_snapshot_store
+
+logger = logging.getLogger(__name__)
+
+RENAME_QUEUE_FILE = "rename_queue.json"
+RENAME_QUEUE_LOCK = threading.Lock()
+MAX_RENAME_ATTEMPTS = 5
+
+class RenameQueue:
+    """Отложенная очередь переименования файлов торрентов.
+
+    Задания сохраняются в файл и переживают перезапуск. Фоновая задача периодически
+    проверяет состояние всех ожидающих торрентов одним снимком qBittorrent и переименовывает
+    те, что уже загружены, поэтому сканирование никогда не ждёт окончания загрузки.
+    """
+    def __init__(self, auth_manager, socketio, interval: float = 30):
+        self.auth_manager = auth_manager
+        self.socketio = socketio
+        self.interval = interval
+        self.jobs: Dict[str, dict] = self.load()
+        self._stop_event = threading.Event()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task = None
+
+    def load(self) -> Dict[str, dict]:
+        with RENAME_QUEUE_LOCK:
+            if not os.path.exists(RENAME_QUEUE_FILE):
+                return {}
+            try:
+                with open(RENAME_QUEUE_FILE, "r", encoding="utf-8") as f:
+                    jobs = json.load(f)
+                logger.info(f"Загружена очередь переименования: {len(jobs)} заданий")
+                return jobs
+            except (json.JSONDecodeError, Exception) as e:
+                logger.error(f"Ошибка чтения {RENAME_QUEUE_FILE}: {e}, очередь пуста")
+                return {}
+
+    def save(self):
+        with RENAME_QUEUE_LOCK:
+            try:
+                with open(RENAME_QUEUE_FILE, "w", encoding="utf-8") as f:
+                    json.dump(dict(self.jobs), f, ensure_ascii=False, indent=4)
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении очереди переименования: {e}")
+
+    def enqueue(self, torrent_hash: str, save_path: str, series_name: str, season: str, torrent_id: str):
+        job = {
+            "torrent_hash": torrent_hash,
+            "save_path": save_path,
+            "series_name": series_name,
+            "season": season,
+            "torrent_id": torrent_id,
+            "attempts": self.jobs.get(torrent_hash, {}).get("attempts", 0),
+            "queued_at": self.jobs.get(torrent_hash, {}).get("queued_at") or datetime.now(timezone.utc).isoformat()
+        }
+        if self.jobs.get(torrent_hash) == job:
+            return
+        self.jobs[torrent_hash] = job
+        self.save()
+        logger.info(f"Переименование торрента {torrent_hash} (ID {torrent_id}) поставлено в очередь")
+
+    def size(self) -> int:
+        return len(self.jobs)
+
+    def list_jobs(self) -> List[dict]:
+        return list(self.jobs.values())
+
+    def start(self):
+        if self._task and not self._task.done():
+            return
+        self._stop_event.clear()
+        self._wakeup = asyncio.Event()
+        self._task = get_event_loop_service().submit(self._run())
+        logger.info(f"Очередь переименования запущена, заданий: {self.size()}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._wakeup is not None:
+            get_event_loop_service().loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.jobs:
+                    await self.process_pending()
+            except Exception as e:
+                logger.error(f"Ошибка в очереди переименования: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def process_pending(self):
+        if not self.auth_manager.get_qb_client():
+            return
+        qb_manager = self.auth_manager.get_qb_manager()
+        torrent_index = await qb_manager.get_torrent_index()
+        changed = False
+        for torrent_hash, job in list(self.jobs.items()):
+            torrent = torrent_index.get_by_hash(torrent_hash)
+            if not torrent:
+                logger.warning(f"Торрент {torrent_hash} из очереди переименования удалён из qBittorrent")
+                self.jobs.pop(torrent_hash, None)
+                changed = True
+                continue
+            if not is_torrent_completed(torrent):
+                continue
+            try:
+                await qb_manager.rename_torrent_files(
+                    torrent_hash, job["save_path"], job["series_name"], job["season"], job["torrent_id"], self.socketio
+                )
+                self._finish(torrent_hash, job)
+                logger.info(f"Переименование торрента {torrent_hash} из очереди выполнено")
+                # Имена файлов в снимках окна статуса устарели
+                await asyncio.to_thread(get_snapshot_store().forget_files, torrent_hash)
+            except Exception as e:
+                job["attempts"] = job.get("attempts", 0) + 1
+                if job["attempts"] >= MAX_RENAME_ATTEMPTS:
+                    logger.error(f"Переименование торрента {torrent_hash} не удалось после {job['attempts']} попыток, задание удалено: {e}")
+                    self._finish(torrent_hash, job)
+                else:
+                    logger.warning(f"Попытка {job['attempts']}/{MAX_RENAME_ATTEMPTS} переименования торрента {torrent_hash} не удалась: {e}")
+            changed = True
+        if changed:
+            self.save()
+
+    def _finish(self, torrent_hash: str, job: dict):
+        """Убирает обработанное задание, если за время переименования его не заменили новым."""
+        if self.jobs.get(torrent_hash) is job:
+            del self.jobs[torrent_hash]
@@ -1,12 +1,12 @@
-import asyncio
 from flask import render_template, redirect, url_for, request, jsonify
 import logging
-from monitor import scheduler, run_scan_series, find_series_data, monitor_task
+from monitor import scheduler, run_monitor_task, find_series_data
+from event_loop import get_event_loop_service
 from utils import load_logs
-import threading
+from qbittorrent_manager import is_torrent_completed
+from scan_snapshots import DEFAULT_STATUS_TTL, build_dashboard, build_status, get_snapshot_store
 from urllib.parse import urlparse
 import hashlib
-from qbittorrent_manager import QBittorrentManager
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +14,20 @@ def setup_routes(app, socketio, auth_manager, config):
     def get_scraper(series_url):
         return auth_manager.get_scraper(series_url)
 
+    def refresh_snapshot_in_background(series_url):
+        """Ставит обновление снимка сериала в очередь сканирования, если оно ещё не выполняется."""
+        snapshots = get_snapshot_store()
+        if not snapshots.begin_refresh(series_url):
+            return
+
+        def refresh_done(future):
+            snapshots.end_refresh(series_url)
+            if not future.cancelled() and future.exception() is not None:
+                socketio.emit('status_snapshot', {'series_url': series_url, 'error': str(future.exception())})
+
+        future, _ = auth_manager.scan_queue.enqueue(series_url, manual=True, refresh_only=True)
+        future.add_done_callback(refresh_done)
+
     @app.route('/')
     def index():
         return render_template(
@@ -62,6 +76,7 @@ def setup_routes(app, socketio, auth_manager, config):
     def delete_series(series_url):
         if config.remove_series(series_url):
             config.config = config.load_or_create_config()
+            get_snapshot_store().remove(series_url)
             socketio.emit('notification', {'message': f'Сериал {series_url} удален', 'type': 'success'})
         return redirect(url_for('index'))
 
@@ -88,11 +103,12 @@ def setup_routes(app, socketio, auth_manager, config):
     @app.route('/scan')
     def force_scan():
         series = config.get("series", {})
+        queued = 0
         for series_url in series:
             scraper = get_scraper(series_url)
             if scraper:
-                threading.Thread(target=run_scan_series, args=(series_url, socketio, auth_manager, config), daemon=True).start()
-        socketio.emit('notification', {'message': 'Сканирование всех сериалов запущено', 'type': 'info'})
+                queued += auth_manager.scan_queue.enqueue(series_url, manual=True)[1]
+        socketio.emit('notification', {'message': f'Сканирование всех сериалов запущено (в очередь добавлено: {queued})', 'type': 'info'})
         return redirect(url_for('index'))
 
     @app.route('/scan_series/<path:series_url>')
@@ -100,7 +116,10 @@ def setup_routes(app, socketio, auth_manager, config):
         scraper = get_scraper(series_url)
         series_data = find_series_data(series_url, config)
         if series_data and scraper:
-            threading.Thread(target=run_scan_series, args=(series_url, socketio, auth_manager, config), daemon=True).start()
+            _, added = auth_manager.scan_queue.enqueue(series_url, manual=True)
+            if not added:
+                socketio.emit('notification', {'message': f'Сканирование {series_url} уже в очереди', 'type': 'info'})
+                return jsonify({"status": "already_queued"})
             socketio.emit('notification', {'message': f'Сканирование запущено для {series_url}', 'type': 'info'})
             return jsonify({"status": "started"})
         socketio.emit('notification', {'message': 'Сериал не найден', 'type': 'danger'})
@@ -123,41 +142,39 @@ def setup_routes(app, socketio, auth_manager, config):
             socketio.emit('notification', {'message': 'Парсер не найден для этого URL', 'type': 'danger'})
             return jsonify({"error": "Парсер не найден"}), 400
         
-        try:
-            episodes = asyncio.run(scraper.get_episodes(series_url, quality=series_data.get("quality")))
-            logger.info(f"Получено {len(episodes)} эпизодов для {series_url} через парсер")
-            if not episodes:
-                socketio.emit('notification', {'message': 'Эпизоды не найдены для этого сериала', 'type': 'warning'})
-        except Exception as e:
-            logger.error(f"Ошибка при получении эпизодов для {series_url}: {str(e)}")
-            socketio.emit('notification', {'message': f'Ошибка при сканировании сайта: {str(e)}', 'type': 'danger'})
-            return jsonify({"error": f"Ошибка при сканировании сайта: {str(e)}"}), 500
-        
-        qb_client = auth_manager.get_qb_client()
-        qb_torrents = qb_client.torrents_info() if qb_client else []
-        torrent_ids = series_data.get("torrent_ids", [ep["torrent_id"] for ep in episodes])
+        snapshots = get_snapshot_store()
+        snapshot = snapshots.get(series_url)
+        qb_manager = auth_manager.get_qb_manager()
+        torrent_ids = series_data.get("torrent_ids", [ep["torrent_id"] for ep in (snapshot or {}).get("episodes", [])])
 
         if request.method == 'POST':
             series_data["series_name"] = request.form['series_name'].strip()
             series_data["season"] = request.form['season'].strip()
             config.save_config()
-            torrent_hashes = [t.hash for t in qb_torrents if any(t_id in t.tags for t_id in torrent_ids)]
-            try:
-                qb_manager = QBittorrentManager(qb_client)
-                for torrent_hash in torrent_hashes:
-                    logger.info(f"Обработка торрента с хэшем {torrent_hash}")
-                    torrent = next((torrent for torrent in qb_torrents if torrent.hash == torrent_hash), None)
+
+            async def rename_series_torrents():
+                torrent_index = await qb_manager.get_torrent_index()
+                for torrent_id in torrent_ids:
+                    torrent = torrent_index.get_by_tag(torrent_id)
                     if not torrent:
-                        logger.warning(f"Торрент с хэшем {torrent_hash} не найден")
+                        logger.warning(f"Торрент с ID {torrent_id} не найден в qBittorrent")
                         continue
-                    torrent_id = next((t_id for t_id in torrent_ids if t_id in torrent.tags), None)
-                    if not torrent_id:
-                        logger.warning(f"ID торрента не найден для хэша {torrent_hash}")
+                    torrent_hash = torrent.hash
+                    logger.info(f"Обработка торрента с хэшем {torrent_hash}")
+                    if not is_torrent_completed(torrent):
+                        auth_manager.rename_queue.enqueue(
+                            torrent_hash, series_data["save_path"], series_data["series_name"],
+                            series_data["season"], torrent_id
+                        )
                         continue
-                    asyncio.run(qb_manager.rename_torrent_files(
+                    await qb_manager.rename_torrent_files(
                         torrent_hash, series_data["save_path"], series_data["series_name"], 
                         series_data["season"], torrent_id, socketio
-                    ))
+                    )
+
+            try:
+                get_event_loop_service().run(rename_series_torrents())
+                snapshots.invalidate(series_url)
                 socketio.emit('notification', {'message': f'Переименование для {series_url} применено', 'type': 'success'})
                 return jsonify({"message": "Переименование выполнено"})
             except Exception as e:
@@ -165,48 +182,45 @@ def setup_routes(app, socketio, auth_manager, config):
                 socketio.emit('notification', {'message': f'Ошибка при переименовании: {str(e)}', 'type': 'danger'})
                 return jsonify({"error": str(e)}), 500
 
-        status_data = {
-            "episodes": [
-                {
-                    "name": ep["name"],
-                    "date": ep.get("last_updated", "Неизвестно"),
-                    "torrent_id": ep["torrent_id"],
-                    "status": "Есть на сайте"
-                } for ep in episodes
-            ],
-            "total": len(episodes),
-            "downloaded": 0,
-            "new": len(episodes)
-        }
-        rename_preview = []
-        has_completed = False
-        for ep in status_data["episodes"]:
-            torrent = next((torrent for torrent in qb_torrents if ep["torrent_id"] in torrent.tags), None)
-            if torrent:
-                qb_manager = QBittorrentManager(qb_client)
-                status = qb_manager.get_torrent_status(torrent.hash)
-                if status:
-                    ep["status"] = status["state"]
-                    if status["completed"]:
-                        has_completed = True
-                        status_data["downloaded"] += 1
-                        status_data["new"] -= 1
-                        files = qb_client.torrents_files(torrent_hash=torrent.hash)
-                        for file in files:
-                            new_name = qb_manager.get_new_filename(file.name, series_data["series_name"], series_data["season"])
-                            rename_preview.append({
-                                "current_name": file.name,
-                                "new_name": new_name or "Паттерн не найден",
-                                "torrent_hash": torrent.hash,
-                                "torrent_id": ep["torrent_id"]
-                            })
+        # Окно статуса отвечает из последнего снимка; трекер опрашивается в фоне, только если снимок устарел
+        ttl = config.get("status_ttl", DEFAULT_STATUS_TTL)
+        if not snapshot or snapshot.get("stale") or snapshots.age(snapshot) > ttl:
+            refresh_snapshot_in_background(series_url)
+        if not snapshot:
+            return jsonify({"pending": True, "refreshing": True}), 202
+        status = build_status(snapshot, series_data)
+        age = snapshots.age(snapshot)
         return jsonify({
-            "status_data": status_data,
-            "rename_preview": rename_preview if has_completed else [],
+            "status_data": status["status_data"],
+            "rename_preview": status["rename_preview"],
             "series_data": series_data,
-            "can_rename": has_completed
+            "can_rename": status["status_data"]["downloaded"] > 0,
+            "freshness": {
+                "scanned_at": snapshot["scanned_at"],
+                "age": int(age),
+                "stale": bool(snapshot.get("stale")) or age > ttl,
+                "refreshing": snapshots.is_refreshing(series_url)
+            }
         })
 
+    @app.route('/api/status_all')
+    def api_status_all():
+        """Краткий статус всех сериалов одним ответом; ETag позволяет браузеру перепроверять его без тела."""
+        qb_manager = auth_manager.get_qb_manager() if auth_manager.get_qb_client() else None
+        try:
+            dashboard = get_event_loop_service().run(build_dashboard(qb_manager, list(config.get("series", {})), get_snapshot_store()))
+        except Exception as e:
+            logger.error(f"Ошибка получения статуса сериалов: {e}")
+            return jsonify({"error": str(e)}), 500
+        response = jsonify({
+            "series": dashboard,
+            "qbittorrent": qb_manager is not None,
+            "status_ttl": config.get("status_ttl", DEFAULT_STATUS_TTL)
+        })
+        response.headers["Cache-Control"] = "no-cache"
+        response.add_etag()
+        return response.make_conditional(request)
+
     @app.route('/api/toggle_rename/<path:series_url>', methods=['POST'])
     def toggle_rename(series_url):
         data = request.get_json()
@@ -219,6 +233,21 @@ def setup_routes(app, socketio, auth_manager, config):
         logger.info(f"Авто-переименование для {series_url} установлено в {data['enabled']}")
         return jsonify({"status": "ok"})
 
+    @app.route('/api/rename_queue')
+    def rename_queue_status():
+        return jsonify({
+            "pending": auth_manager.rename_queue.size(),
+            "jobs": auth_manager.rename_queue.list_jobs()
+        })
+
+    @app.route('/api/jobs')
+    def jobs_status():
+        return jsonify({
+            "scans": auth_manager.scan_queue.stats(),
+            "previews": auth_manager.preview_jobs.stats(),
+            "rename_pending": auth_manager.rename_queue.size()
+        })
+
     @app.route('/api/scan_url', methods=['POST'])
     def scan_url():
         series_url = request.json.get('series_url', '').strip()
@@ -231,47 +260,21 @@ def setup_routes(app, socketio, auth_manager, config):
                 return jsonify({"error": "Парсер для nnmclub.to отключён"}), 400
             socketio.emit('notification', {'message': 'Парсер не найден для этого URL', 'type': 'danger'})
             return jsonify({"error": "Парсер не найден для этого URL"}), 400
-        try:
-            result = asyncio.run(scraper.get_episodes(series_url))
-            if not result:
-                socketio.emit('notification', {'message': 'Эпизоды не найдены', 'type': 'warning'})
-                return jsonify({"error": "Эпизоды не найдены"}), 404
-            
-            torrent_ids = [ep["torrent_id"] for ep in result]
-            quality_options = [{"quality": ep.get("quality", "N/A")} for ep in result] if any("quality" in ep and ep["quality"] != "N/A" for ep in result) else []
-            qb_client = auth_manager.get_qb_client()
-            qb_torrents = qb_client.torrents_info() if qb_client else []
-            names = result[0].get("names", [result[0]["name"]]) if "names" in result[0] else [result[0]["name"]]
-            status_data = {
-                "episodes": [
-                    {
-                        "name": ep["name"],
-                        "episode_name": ep.get("episode_name", ep["name"]),
-                        "torrent_id": ep["torrent_id"],
-                        "quality": ep.get("quality", "N/A"),
-                        "last_updated": ep.get("last_updated", ""),
-                        "status": "Есть на сайте" if not any(ep["torrent_id"] in t.tags for t in qb_torrents) else 
-                                  QBittorrentManager(qb_client).get_torrent_status(next(t.hash for t in qb_torrents if ep["torrent_id"] in t.tags))["state"]
-                    } for ep in result
-                ]
-            }
-            response = {
-                "name": result[0]["name"],
-                "names": names,
-                "torrent_ids": torrent_ids,
-                "status_data": status_data
-            }
-            if quality_options:
-                response["quality_options"] = quality_options
-            return jsonify(response)
-        except Exception as e:
-            logger.error(f"Ошибка при сканировании URL: {e}")
-            socketio.emit('notification', {'message': f'Ошибка при сканировании: {str(e)}', 'type': 'danger'})
-            return jsonify({"error": str(e)}), 500
+        # Разбор страницы выполняется в пуле заданий; результат приходит событием scan_url_result
+        job = auth_manager.preview_jobs.submit(series_url)
+        return jsonify(job), 200 if job["status"] in ("done", "error") else 202
+
+    @app.route('/api/scan_url/<job_id>')
+    def scan_url_job(job_id):
+        job = auth_manager.preview_jobs.get(job_id)
+        if not job:
+            return jsonify({"error": "Задание не найдено или устарело"}), 404
+        return jsonify(job)
 
     @app.route('/update_settings', methods=['POST'])
     def update_settings():
         config.set("qbittorrent", {
+            **config.get("qbittorrent", {}),
             "host": request.form['qb_host'].strip(),
             "username": request.form['qb_username'].strip(),
             "password": request.form['qb_password'].strip()
@@ -295,12 +298,12 @@ def setup_routes(app, socketio, auth_manager, config):
             "kinozal": {"status": "Проверка...", "spinner": True},
             "rutracker": {"status": "Проверка...", "spinner": True}
         }
-        socketio.start_background_task(auth_manager.initialize)
+        get_event_loop_service().submit(auth_manager.initialize())
         
         if scheduler.running:
             scheduler.remove_all_jobs()
             scheduler.add_job(
-                lambda: asyncio.run(monitor_task(socketio, auth_manager, config)),
+                lambda: run_monitor_task(socketio, auth_manager, config),
                 'interval',
                 minutes=new_interval,
                 id='monitor_task'
@@ -0,0 +1,161 @@
+import asyncio
+import itertools
+import threading
+import logging
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from event_loop import get_event_loop_service
+from monitor import scan_series, refresh_snapshot, get_series_domain, DEFAULT_MAX_CONCURRENT_SCANS, DEFAULT_DOMAIN_CONCURRENCY, DEFAULT_UNKNOWN_DOMAIN_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_MANUAL = 0
+PRIORITY_SCHEDULED = 1
+
+class ScanQueue:
+    """Общая очередь сканирования сериалов с фиксированным числом рабочих задач.
+
+    Через неё проходят ручные сканирования (/scan, /scan_series) и циклы планировщика.
+    Сериал, который уже ждёт в очереди или сканируется, повторно не ставится: вызывающий
+    получает Future существующего задания. Ручные задания выбираются раньше плановых,
+    а лимиты по доменам не дают рабочим задачам одновременно нагружать один трекер.
+    Рабочие задачи выполняются в общем цикле событий приложения, ставить задания можно из любого потока.
+
+    Обновления снимков для окна статуса (refresh_only) проходят через ту же очередь и лимиты
+    доменов, но только читают трекер; если сериал уже ждёт сканирования, обновление
+    получает Future этого сканирования, ведь оно тоже сохраняет снимок.
+    """
+    def __init__(self, auth_manager, socketio, config):
+        self.auth_manager = auth_manager
+        self.socketio = socketio
+        self.config = config
+        self.workers = max(1, config.get("max_concurrent_scans", DEFAULT_MAX_CONCURRENT_SCANS))
+        self.domain_concurrency = {**DEFAULT_DOMAIN_CONCURRENCY, **config.get("domain_concurrency", {})}
+        self.pending: Dict[str, dict] = {}
+        self.running: Dict[str, dict] = {}
+        self.domain_active: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[Future] = []
+
+    def start(self):
+        if any(not worker.done() for worker in self._workers):
+            return
+        self._stopped = False
+        service = get_event_loop_service()
+        service.start()
+        self._wakeup = asyncio.Event()
+        self._workers = [service.submit(self._run()) for _ in range(self.workers)]
+        logger.info(f"Очередь сканирования запущена, рабочих задач: {self.workers}")
+
+    def stop(self):
+        self._stopped = True
+        self._notify()
+
+    def _notify(self):
+        """Будит рабочие задачи; безопасно вызывать из любого потока."""
+        if self._wakeup is not None:
+            get_event_loop_service().loop.call_soon_threadsafe(self._wakeup.set)
+
+    def enqueue(self, series_url: str, manual: bool = False, torrent_index=None, refresh_only: bool = False) -> Tuple[Future, bool]:
+        """Ставит сериал в очередь; возвращает Future результата scan_series и признак нового задания."""
+        priority = PRIORITY_MANUAL if manual else PRIORITY_SCHEDULED
+        key = ("refresh", series_url) if refresh_only else series_url
+        with self._lock:
+            job = self.running.get(key) or self.pending.get(key)
+            if refresh_only and not job:
+                job = self.running.get(series_url) or self.pending.get(series_url)
+            if job:
+                if priority < job["priority"] and job["key"] in self.pending:
+                    # Ручной запуск поднимает уже ждущее плановое задание в начало очереди
+                    job["priority"] = priority
+                    job["source"] = "manual"
+                logger.info(f"Сериал {series_url} уже в очереди сканирования")
+                return job["future"], False
+            job = {
+                "key": key,
+                "refresh_only": refresh_only,
+                "series_url": series_url,
+                "domain": get_series_domain(series_url),
+                "priority": priority,
+                "source": "manual" if manual else "scheduled",
+                "seq": next(self._seq),
+                "queued_at": datetime.now().isoformat(timespec="seconds"),
+                "torrent_index": torrent_index,
+                "future": Future()
+            }
+            self.pending[key] = job
+        self._notify()
+        if not refresh_only:
+            self.socketio.emit('status_update', {'series_url': series_url, 'status': 'В очереди', 'progress': 0, 'total': 0})
+        return job["future"], True
+
+    def _domain_limit(self, domain: str) -> int:
+        return self.domain_concurrency.get(domain, DEFAULT_UNKNOWN_DOMAIN_CONCURRENCY)
+
+    def _next_job(self) -> Optional[dict]:
+        eligible = [
+            job for job in self.pending.values()
+            if self.domain_active.get(job["domain"], 0) < self._domain_limit(job["domain"])
+        ]
+        return min(eligible, key=lambda job: (job["priority"], job["seq"])) if eligible else None
+
+    def _take_job(self) -> Optional[dict]:
+        with self._lock:
+            job = self._next_job()
+            if job:
+                del self.pending[job["key"]]
+                self.running[job["key"]] = job
+                self.domain_active[job["domain"]] = self.domain_active.get(job["domain"], 0) + 1
+                job["started_at"] = datetime.now().isoformat(timespec="seconds")
+            return job
+
+    async def _run(self):
+        while not self._stopped:
+            job = self._take_job()
+            if job is None:
+                # Все рабочие задачи в одном потоке цикла: между clear и wait задание не может потеряться
+                self._wakeup.clear()
+                job = self._take_job()
+                if job is None:
+                    await self._wakeup.wait()
+                    continue
+            series_url = job["series_url"]
+            try:
+                if job["refresh_only"]:
+                    result = await refresh_snapshot(series_url, self.socketio, self.auth_manager, self.config)
+                else:
+                    result = await scan_series(series_url, self.socketio, self.auth_manager, self.config, job["torrent_index"])
+                job["future"].set_result(result)
+            except Exception as e:
+                if job["refresh_only"]:
+                    logger.error(f"Ошибка обновления снимка для {series_url}: {str(e)}")
+                else:
+                    logger.error(f"Ошибка сканирования {series_url}: {str(e)}", exc_info=True)
+                    self.socketio.emit('status_update', {'series_url': series_url, 'status': f'Ошибка: {str(e)}', 'progress': 0, 'total': 0})
+                job["future"].set_exception(e)
+            finally:
+                with self._lock:
+                    self.running.pop(job["key"], None)
+                    self.domain_active[job["domain"]] -= 1
+                # Освободился слот домена: другие задачи могут взять ждавшие его задания
+                self._wakeup.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued = sorted(self.pending.values(), key=lambda job: (job["priority"], job["seq"]))
+            return {
+                "workers": self.workers,
+                "queue_depth": len(queued),
+                "queued": [
+                    {"series_url": job["series_url"], "source": job["source"], "refresh_only": job["refresh_only"], "queued_at": job["queued_at"]}
+                    for job in queued
+                ],
+                "running": [
+                    {"series_url": job["series_url"], "source": job["source"], "refresh_only": job["refresh_only"], "started_at": job["started_at"]}
+                    for job in self.running.values()
+                ]
+            }
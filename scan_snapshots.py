@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+from qbittorrent_manager import STATUS_MAP, is_torrent_completed
+from rename_engine import plan_renames
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = "scan_snapshots"
+DEFAULT_STATUS_TTL = 600  # Секунды, после которых снимок сериала обновляется в фоне
+
+async def collect_episode_status(qb_manager, episodes):
+    """Торренты и статусы эпизодов сериала в одном цикле событий."""
+    torrent_index = await qb_manager.get_torrent_index()
+    episode_torrents = {ep["torrent_id"]: torrent_index.get_by_tag(ep["torrent_id"]) for ep in episodes}
+    statuses = await qb_manager.get_torrent_statuses([t.hash for t in episode_torrents.values() if t])
+    return episode_torrents, statuses
+
+async def capture_snapshot(qb_manager, episodes: List[dict], previous: Optional[dict] = None) -> dict:
+    """Снимок сериала: разобранные эпизоды и состояние их торрентов в qBittorrent на момент сканирования.
+
+    Для завершённых торрентов сохраняются имена файлов (предпросмотр переименования). Они
+    запрашиваются у qBittorrent, только если торрента с тем же хэшем не было в прошлом снимке
+    или его файлы с тех пор сброшены (forget_files).
+    """
+    torrents = {}
+    if qb_manager:
+        episode_torrents, statuses = await collect_episode_status(qb_manager, episodes)
+        previous_files = {
+            torrent["hash"]: torrent["files"]
+            for torrent in (previous or {}).get("torrents", {}).values() if "files" in torrent
+        }
+        for torrent_id, torrent in episode_torrents.items():
+            status = statuses.get(torrent.hash) if torrent else None
+            if status:
+                torrents[torrent_id] = {
+                    "hash": torrent.hash,
+                    "state": status["state"],
+                    "completed": status["completed"]
+                }
+        missing = [t["hash"] for t in torrents.values() if t["completed"] and t["hash"] not in previous_files]
+        files = await asyncio.gather(*(qb_manager.client.torrents_files(torrent_hash=h) for h in missing))
+        previous_files.update({h: [f.name for f in torrent_files] for h, torrent_files in zip(missing, files)})
+        for torrent in torrents.values():
+            if torrent["completed"]:
+                torrent["files"] = previous_files[torrent["hash"]]
+    return {
+        "scanned_at": datetime.now().isoformat(timespec="seconds"),
+        "episodes": episodes,
+        "torrents": torrents
+    }
+
+def build_status(snapshot: dict, series_data: dict) -> dict:
+    """Данные окна статуса из снимка; предпросмотр переименования строится по текущим названию и сезону."""
+    status_data = {"episodes": [], "total": len(snapshot["episodes"]), "downloaded": 0, "new": len(snapshot["episodes"])}
+    rename_preview = []
+    for ep in snapshot["episodes"]:
+        torrent = snapshot["torrents"].get(ep["torrent_id"])
+        status_data["episodes"].append({
+            "name": ep["name"],
+            "date": ep.get("last_updated", "Неизвестно"),
+            "torrent_id": ep["torrent_id"],
+            "status": torrent["state"] if torrent else "Есть на сайте"
+        })
+        if torrent and torrent["completed"]:
+            status_data["downloaded"] += 1
+            status_data["new"] -= 1
+            for current_name, new_name in plan_renames(torrent.get("files", []), series_data["series_name"], series_data["season"]):
+                rename_preview.append({
+                    "current_name": current_name,
+                    "new_name": new_name or "Паттерн не найден",
+                    "torrent_hash": torrent["hash"],
+                    "torrent_id": ep["torrent_id"]
+                })
+    return {"status_data": status_data, "rename_preview": rename_preview}
+
+async def build_dashboard(qb_manager, series_urls: List[str], store: "ScanSnapshotStore") -> Dict[str, dict]:
+    """Краткий статус всех сериалов: эпизоды из снимков, состояние торрентов из одного списка qBittorrent.
+
+    Без подключения к qBittorrent используется состояние, сохранённое в снимке при сканировании.
+    """
+    torrent_index = await qb_manager.get_torrent_index() if qb_manager else None
+    dashboard = {}
+    for series_url in series_urls:
+        snapshot = store.get(series_url)
+        if not snapshot:
+            dashboard[series_url] = {"scanned_at": None}
+            continue
+        summary = {"scanned_at": snapshot["scanned_at"], "total": len(snapshot["episodes"]), "downloaded": 0, "downloading": 0, "errors": 0}
+        for ep in snapshot["episodes"]:
+            if torrent_index is not None:
+                torrent = torrent_index.get_by_tag(ep["torrent_id"])
+                state = STATUS_MAP.get(torrent.state, "Неизвестно") if torrent else None
+                completed = bool(torrent) and is_torrent_completed(torrent)
+            else:
+                torrent = snapshot["torrents"].get(ep["torrent_id"])
+                state = torrent["state"] if torrent else None
+                completed = bool(torrent) and torrent["completed"]
+            if completed:
+                summary["downloaded"] += 1
+            elif state == "Ошибка":
+                summary["errors"] += 1
+            elif state:
+                summary["downloading"] += 1
+        summary["new"] = summary["total"] - summary["downloaded"] - summary["downloading"] - summary["errors"]
+        dashboard[series_url] = summary
+    return dashboard
+
+class ScanSnapshotStore:
+    """Последние снимки сканирования по сериалам, сохраняемые на диск по файлу на сериал.
+
+    Окно статуса отвечает из снимка без обращения к трекеру; устаревший снимок
+    обновляется в фоне, и одновременно для сериала выполняется не больше одного обновления.
+    Сохранение снимка перезаписывает только файл этого сериала.
+    """
+    def __init__(self, path: str = SNAPSHOT_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.snapshots: Dict[str, dict] = self.load()
+
+    def _file(self, series_url: str) -> str:
+        return os.path.join(self.path, hashlib.sha1(series_url.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self) -> Dict[str, dict]:
+        if not os.path.isdir(self.path):
+            return {}
+        snapshots = {}
+        for name in os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            file_path = os.path.join(self.path, name)
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                snapshots[entry["series_url"]] = entry["snapshot"]
+            except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+                logger.error(f"Ошибка чтения {file_path}: {e}, снимок пропущен")
+        return snapshots
+
+    def _save(self, series_url: str):
+        file_path = self._file(series_url)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump({"series_url": series_url, "snapshot": self.snapshots[series_url]}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.error(f"Ошибка сохранения {file_path}: {e}")
+
+    def get(self, series_url: str) -> Optional[dict]:
+        with self._lock:
+            return self.snapshots.get(series_url)
+
+    def put(self, series_url: str, snapshot: dict):
+        """Сохраняет снимок; пишет на диск, поэтому из цикла событий вызывается через asyncio.to_thread."""
+        with self._lock:
+            self.snapshots[series_url] = snapshot
+            self._save(series_url)
+
+    def invalidate(self, series_url: str):
+        """Помечает снимок устаревшим, чтобы следующий запрос статуса обновил его вместе с файлами торрентов."""
+        with self._lock:
+            snapshot = self.snapshots.get(series_url)
+            if snapshot:
+                self.snapshots[series_url] = {**snapshot, "stale": True, "torrents": self._without_files(snapshot["torrents"])}
+                self._save(series_url)
+
+    def forget_files(self, torrent_hash: str):
+        """Сбрасывает сохранённые имена файлов торрента после переименования: следующий снимок запросит их заново."""
+        with self._lock:
+            for series_url, snapshot in self.snapshots.items():
+                if any(t["hash"] == torrent_hash and "files" in t for t in snapshot["torrents"].values()):
+                    self.snapshots[series_url] = {**snapshot, "stale": True, "torrents": self._without_files(snapshot["torrents"], torrent_hash)}
+                    self._save(series_url)
+
+    @staticmethod
+    def _without_files(torrents: Dict[str, dict], torrent_hash: Optional[str] = None) -> Dict[str, dict]:
+        return {
+            torrent_id: {key: value for key, value in torrent.items() if key != "files"}
+            if torrent_hash is None or torrent["hash"] == torrent_hash else torrent
+            for torrent_id, torrent in torrents.items()
+        }
+
+    def remove(self, series_url: str):
+        with self._lock:
+            if self.snapshots.pop(series_url, None) is not None:
+                try:
+                    os.remove(self._file(series_url))
+                except OSError as e:
+                    logger.error(f"Ошибка удаления снимка {series_url}: {e}")
+
+    def age(self, snapshot: dict) -> float:
+        return (datetime.now() - datetime.fromisoformat(snapshot["scanned_at"])).total_seconds()
+
+    def begin_refresh(self, series_url: str) -> bool:
+        """False, если обновление снимка этого сериала уже выполняется."""
+        with self._lock:
+            if series_url in self._refreshing:
+                return False
+            self._refreshing.add(series_url)
+            return True
+
+    def end_refresh(self, series_url: str):
+        with self._lock:
+            self._refreshing.discard(series_url)
+
+    def is_refreshing(self, series_url: str) -> bool:
+        with self._lock:
+            return series_url in self._refreshing
+
+_snapshot_store = None
+_snapshot_store_lock = threading.Lock()
+
+def get_snapshot_store() -> ScanSnapshotStore:
+    global _snapshot_store
+    with _snapshot_store_lock:
+        if _snapshot_store is None:
+            _snapshot_store = ScanSnapshotStore()
+        return _snapshot_store
@@ -1,11 +1,11 @@
-import asyncio
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
+import json
+import re
 from lxml import html
 import logging
 from datetime import datetime
 from .base_scraper import BaseScraper
+from .browser_worker import BrowserWorkerClient
+from .http_transport import HttpClient
 import hashlib
 import os
 
@@ -15,35 +15,191 @@ logger = logging.getLogger(__name__)
 # Установите в True, чтобы сохранять дебаг-файлы, или в False, чтобы отключить
 DEBUG_SAVE_HTML = False
 
+# Элементы страницы релиза: по ним же определяется готовность страницы в браузере
+TITLE_XPATH = '//div[@class="fz-70 ff-heading text-grey-darken-2 mb-3"]'
+TORRENT_ITEM_XPATH = '//div[contains(@class, "v-list-item--density-default v-list-item--one-line")]'
+QUALITY_XPATH = '//div[@class="fz-65 text-grey-darken-2"]'
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36"
+
+# Публичный API сайта: те же данные релиза в JSON, без отрисовки страницы в браузере
+API_BASE_URL = "https://anilibria.top/api/v1"
+RELEASE_ALIAS_RE = re.compile(r"/anime/releases/release/([^/?#]+)")
+
+def clean_series_name(series_name: str) -> str:
+    # Удаляем суффикс "2nd Season" или аналогичные
+    return series_name.strip().replace(" 2nd Season", "").replace(" 1st Season", "").replace(" 3rd Season", "")
+
+def release_alias(series_url: str):
+    """Alias релиза из URL вида https://anilibria.top/anime/releases/release/<alias>/torrents."""
+    match = RELEASE_ALIAS_RE.search(series_url)
+    return match.group(1) if match else None
+
+def _field_text(field) -> str:
+    if isinstance(field, dict):
+        return str(field.get("description") or field.get("label") or field.get("value") or "").strip()
+    return str(field or "").strip()
+
+def torrent_quality_text(torrent: dict) -> str:
+    """Строка качества в том же виде, что и на странице: "1080p WEBRip HEVC"."""
+    parts = [_field_text(torrent.get(key)) for key in ("quality", "type", "codec")]
+    return " ".join(part for part in parts if part)
+
+def parse_release_data(series_url: str, release: dict, torrents: list, quality: str = None) -> list:
+    """Эпизоды из JSON релиза и его торрентов в том же формате, что и при разборе страницы."""
+    series_name = clean_series_name(_field_text((release.get("name") or {}).get("main")))
+    if not series_name:
+        raise ValueError("Название сериала не найдено в данных релиза")
+    episodes = []
+    for torrent in torrents:
+        quality_text = torrent_quality_text(torrent)
+        if not quality_text or (quality and quality_text != quality):
+            continue
+        magnet_link = torrent.get("magnet")
+        updated_at = torrent.get("updated_at") or torrent.get("created_at")
+        if not magnet_link or not updated_at:
+            logger.error(f"Неполные данные торрента для {series_url}, качество {quality_text}")
+            continue
+        # На странице дата показывается в локальном времени с точностью до секунды
+        last_updated = datetime.fromisoformat(updated_at).astimezone().replace(tzinfo=None, microsecond=0).isoformat()
+        episodes.append({
+            "name": series_name,
+            "torrent_url": series_url,
+            "torrent_id": hashlib.md5(f"{series_url}_{quality_text}".encode()).hexdigest()[:8],
+            "magnet_link": magnet_link,
+            "quality": quality_text,
+            "last_updated": last_updated
+        })
+    return episodes
+
+def parse_release_page(series_url: str, html_content: str, quality: str = None) -> list:
+    """Эпизоды со страницы торрентов релиза, отрисованной в браузере."""
+    # Парсинг с использованием lxml
+    tree = html.fromstring(html_content)
+
+    # Извлечение названия сериала
+    title_elem = tree.xpath(f'{TITLE_XPATH}/text()')
+    if not title_elem:
+        logger.error(f"Название сериала не найдено для {series_url}")
+        raise Exception("Название сериала не найдено")
+    series_name = clean_series_name(title_elem[0])
+
+    # Извлечение данных о торрентах
+    torrent_items = tree.xpath(TORRENT_ITEM_XPATH)
+    episodes = []
+    for item in torrent_items:
+        # Качество
+        quality_elem = item.xpath('.//div[@class="fz-65 text-grey-darken-2"]/text()')
+        if not quality_elem:
+            continue
+        quality_text = quality_elem[0].strip().replace(" • ", " ")
+
+        # Если указано качество и оно не совпадает, пропускаем
+        if quality and quality_text != quality:
+            continue
+
+        # Дата обновления
+        date_elem = item.xpath('.//div[@class="fz-75 text-grey" and contains(text(), ",")]/text()')
+        if not date_elem:
+            logger.error(f"Дата обновления не найдена для {series_url}, качество {quality_text}")
+            continue
+        date_text = date_elem[0].strip()
+        try:
+            last_updated = datetime.strptime(date_text, "%d.%m.%Y, %H:%M:%S").isoformat()
+        except ValueError as e:
+            logger.error(f"Ошибка парсинга даты {date_text}: {e}")
+            continue
+
+        # Magnet-ссылка
+        magnet_elem = item.xpath('.//a[contains(@href, "magnet:")]/@href')
+        if not magnet_elem:
+            logger.error(f"Magnet-ссылка не найдена для {series_url}, качество {quality_text}")
+            continue
+        magnet_link = magnet_elem[0]
+
+        # Torrent ID
+        torrent_id = hashlib.md5(f"{series_url}_{quality_text}".encode()).hexdigest()[:8]
+
+        episodes.append({
+            "name": series_name,
+            "torrent_url": series_url,
+            "torrent_id": torrent_id,
+            "magnet_link": magnet_link,
+            "quality": quality_text,
+            "last_updated": last_updated
+        })
+    return episodes
+
+def parse_release_quality_options(release: dict, torrents: list) -> dict:
+    """Название и варианты качества из JSON релиза, как scan_series по странице."""
+    series_name = clean_series_name(_field_text((release.get("name") or {}).get("main")))
+    quality_options = [{"link": "", "quality": text} for text in map(torrent_quality_text, torrents) if text]
+    if not series_name or not quality_options:
+        raise ValueError("В данных релиза нет названия или вариантов качества")
+    return {"name": series_name, "quality_options": quality_options}
+
 class AnilibriaScraper(BaseScraper):
     def __init__(self):
-        self.chrome_options = Options()
-        self.chrome_options.add_argument("--headless")
-        self.chrome_options.add_argument("--no-sandbox")
-        self.chrome_options.add_argument("--disable-dev-shm-usage")
-        self.chrome_options.add_argument("--disable-gpu")
-        self.chrome_options.add_argument("user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36")
-        self.service = Service(executable_path="/usr/local/bin/chromedriver", log_path="chromedriver.log")
-        self.driver = None
-
-    def _init_driver(self):
-        if self.driver is None:
-            self.driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
-            logger.info("Selenium driver запущен")
-
-    def _quit_driver(self):
-        if self.driver is not None:
-            self.driver.quit()
-            self.driver = None
-            logger.info("Selenium driver закрыт")
+        self.api = HttpClient(headers={"User-Agent": USER_AGENT, "Accept": "application/json"})
+        # Selenium работает в отдельном процессе: один браузер на все запросы,
+        # страницы сериалов грузятся в параллельных вкладках
+        self.browser = BrowserWorkerClient({
+            "driver_path": "/usr/local/bin/chromedriver",
+            "log_path": "chromedriver.log",
+            "arguments": [
+                "--headless",
+                "--no-sandbox",
+                "--disable-dev-shm-usage",
+                "--disable-gpu",
+                f"user-agent={USER_AGENT}"
+            ],
+            # Не ждём картинки и стили: готовность страницы проверяется по нужным элементам
+            "page_load_strategy": "eager",
+            "prefs": {"profile.managed_default_content_settings.images": 2}
+        })
+
+    async def _get_json(self, url: str):
+        response = await self.api.get(url)
+        if response.status_code != 200:
+            raise Exception(f"Код ответа API {response.status_code} для {url}")
+        return response.json()
+
+    async def fetch_release_data(self, series_url: str):
+        """Данные релиза и список его торрентов из API сайта."""
+        alias = release_alias(series_url)
+        if not alias:
+            raise ValueError(f"Не удалось определить релиз по URL {series_url}")
+        release = await self._get_json(f"{API_BASE_URL}/anime/releases/{alias}")
+        torrents = release.get("torrents")
+        if torrents is None:
+            torrents = await self._get_json(f"{API_BASE_URL}/anime/torrents/release/{release.get('id', alias)}")
+        if isinstance(torrents, dict):
+            torrents = torrents.get("data", [])
+
+        # Сохранение JSON для отладки, если включено: пригодится как фикстура для разбора
+        if DEBUG_SAVE_HTML:
+            url_hash = hashlib.md5(series_url.encode()).hexdigest()[:8]
+            debug_filename = f"debug_anilibria_{url_hash}.json"
+            with open(debug_filename, "w", encoding="utf-8") as f:
+                json.dump({"release": release, "torrents": torrents}, f, ensure_ascii=False, indent=2)
+            logger.info(f"Данные релиза {series_url} сохранены в {debug_filename}")
+        return release, torrents
 
     async def get_episodes(self, series_url: str, quality: str = None):
-        self._init_driver()
+        logger.info(f"Запрос эпизодов для {series_url} через AnilibriaScraper с качеством {quality}")
         try:
-            logger.info(f"Запрос эпизодов для {series_url} через AnilibriaScraper с качеством {quality}")
-            self.driver.get(series_url)
-            await asyncio.sleep(10)  # Ждём загрузки страницы
-            html_content = self.driver.page_source
+            episodes = parse_release_data(series_url, *await self.fetch_release_data(series_url), quality=quality)
+            if episodes:
+                logger.info(f"Получено {len(episodes)} эпизодов для {series_url} через API")
+                return episodes
+            logger.warning(f"API не вернул эпизодов для {series_url} с качеством {quality}, загрузка страницы в браузере")
+        except Exception as e:
+            logger.warning(f"Ошибка API для {series_url}: {e}, загрузка страницы в браузере")
+        return await self._get_episodes_from_page(series_url, quality)
+
+    async def _get_episodes_from_page(self, series_url: str, quality: str = None):
+        try:
+            html_content = await self.browser.fetch_page(series_url, ready_xpaths=[TITLE_XPATH, TORRENT_ITEM_XPATH])
 
             # Сохранение HTML для отладки, если включено
             if DEBUG_SAVE_HTML:
@@ -53,62 +209,7 @@ class AnilibriaScraper(BaseScraper):
                     f.write(html_content)
                 logger.info(f"HTML страницы {series_url} сохранён в {debug_filename}")
 
-            # Парсинг с использованием lxml
-            tree = html.fromstring(html_content)
-
-            # Извлечение названия сериала
-            title_elem = tree.xpath('//div[@class="fz-70 ff-heading text-grey-darken-2 mb-3"]/text()')
-            if not title_elem:
-                logger.error(f"Название сериала не найдено для {series_url}")
-                raise Exception("Название сериала не найдено")
-            series_name = title_elem[0].strip()
-            # Удаляем суффикс "2nd Season" или аналогичные
-            series_name = series_name.replace(" 2nd Season", "").replace(" 1st Season", "").replace(" 3rd Season", "")
-
-            # Извлечение данных о торрентах
-            torrent_items = tree.xpath('//div[contains(@class, "v-list-item--density-default v-list-item--one-line")]')
-            episodes = []
-            for item in torrent_items:
-                # Качество
-                quality_elem = item.xpath('.//div[@class="fz-65 text-grey-darken-2"]/text()')
-                if not quality_elem:
-                    continue
-                quality_text = quality_elem[0].strip().replace(" • ", " ")
-
-                # Если указано качество и оно не совпадает, пропускаем
-                if quality and quality_text != quality:
-                    continue
-
-                # Дата обновления
-                date_elem = item.xpath('.//div[@class="fz-75 text-grey" and contains(text(), ",")]/text()')
-                if not date_elem:
-                    logger.error(f"Дата обновления не найдена для {series_url}, качество {quality_text}")
-                    continue
-                date_text = date_elem[0].strip()
-                try:
-                    last_updated = datetime.strptime(date_text, "%d.%m.%Y, %H:%M:%S").isoformat()
-                except ValueError as e:
-                    logger.error(f"Ошибка парсинга даты {date_text}: {e}")
-                    continue
-
-                # Magnet-ссылка
-                magnet_elem = item.xpath('.//a[contains(@href, "magnet:")]/@href')
-                if not magnet_elem:
-                    logger.error(f"Magnet-ссылка не найдена для {series_url}, качество {quality_text}")
-                    continue
-                magnet_link = magnet_elem[0]
-
-                # Torrent ID
-                torrent_id = hashlib.md5(f"{series_url}_{quality_text}".encode()).hexdigest()[:8]
-
-                episodes.append({
-                    "name": series_name,
-                    "torrent_url": series_url,
-                    "torrent_id": torrent_id,
-                    "magnet_link": magnet_link,
-                    "quality": quality_text,
-                    "last_updated": last_updated
-                })
+            episodes = parse_release_page(series_url, html_content, quality)
 
             if not episodes:
                 logger.warning(f"Эпизоды не найдены для {series_url}")
@@ -120,8 +221,6 @@ class AnilibriaScraper(BaseScraper):
         except Exception as e:
             logger.error(f"Ошибка при получении эпизодов для {series_url}: {e}")
             return []
-        finally:
-            self._quit_driver()
 
     async def get_torrent_content(self, torrent_url: str):
         # Этот метод теперь не нужен, так как magnet-ссылки извлекаются напрямую
@@ -129,11 +228,17 @@ class AnilibriaScraper(BaseScraper):
         return None
 
     async def scan_series(self, series_url: str):
-        self._init_driver()
         try:
-            self.driver.get(series_url)
-            await asyncio.sleep(10)
-            html_content = self.driver.page_source
+            result = parse_release_quality_options(*await self.fetch_release_data(series_url))
+            logger.info(f"Найдено {len(result['quality_options'])} вариантов качества для {series_url} через API")
+            return result
+        except Exception as e:
+            logger.warning(f"Ошибка API для {series_url}: {e}, загрузка страницы в браузере")
+        return await self._scan_series_from_page(series_url)
+
+    async def _scan_series_from_page(self, series_url: str):
+        try:
+            html_content = await self.browser.fetch_page(series_url, ready_xpaths=[TITLE_XPATH, QUALITY_XPATH])
 
             # Сохранение HTML для отладки, если включено
             if DEBUG_SAVE_HTML:
@@ -147,15 +252,14 @@ class AnilibriaScraper(BaseScraper):
             tree = html.fromstring(html_content)
 
             # Извлечение названия сериала
-            title_elem = tree.xpath('//div[@class="fz-70 ff-heading text-grey-darken-2 mb-3"]/text()')
+            title_elem = tree.xpath(f'{TITLE_XPATH}/text()')
             if not title_elem:
                 logger.error(f"Название сериала не найдено для {series_url}")
                 return {"name": "Ошибка", "quality_options": []}
-            series_name = title_elem[0].strip()
-            series_name = series_name.replace(" 2nd Season", "").replace(" 1st Season", "").replace(" 3rd Season", "")
+            series_name = clean_series_name(title_elem[0])
 
             # Извлечение вариантов качества
-            quality_elems = tree.xpath('//div[@class="fz-65 text-grey-darken-2"]/text()')
+            quality_elems = tree.xpath(f'{QUALITY_XPATH}/text()')
             quality_options = []
             for quality_text in quality_elems:
                 formatted_quality = quality_text.strip().replace(" • ", " ")
@@ -173,6 +277,4 @@ class AnilibriaScraper(BaseScraper):
 
         except Exception as e:
             logger.error(f"Ошибка при сканировании серии: {e}")
-            return {"name": "Ошибка", "quality_options": []}
-        finally:
-            self._quit_driver()
\ No newline at end of file
+            return {"name": "Ошибка", "quality_options": []}
\ No newline at end of file
@@ -1,4 +1,5 @@
 import asyncio
+import time
 import cloudscraper
 from lxml import html
 import logging
@@ -6,6 +7,8 @@ from datetime import datetime
 from .base_scraper import BaseScraper
 import hashlib
 import os
+from urllib.parse import urlparse
+from .http_transport import HttpClient, DEFAULT_TOTAL_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,11 @@ logger = logging.getLogger(__name__)
 # Установите в True, чтобы сохранять дебаг-файлы, или в False, чтобы отключить
 DEBUG_SAVE_HTML = False
 
+# Коды, которыми Cloudflare отвечает на запрос без пройденной проверки
+CHALLENGE_STATUSES = (403, 503)
+# Сколько секунд после проверки Cloudflare запросы к домену сразу идут через cloudscraper
+CHALLENGE_MEMORY = 3600
+
 class AstarBzScraper(BaseScraper):
     def __init__(self, max_retries: int = 3):
         self.scraper = cloudscraper.create_scraper()
@@ -24,20 +32,38 @@ class AstarBzScraper(BaseScraper):
             "Referer": "https://v6.astar.bz/",
             "Connection": "keep-alive"
         }
-
-    async def fetch_page(self, url: str):
+        self.http = HttpClient(headers=self.headers, cache_scope="astar")
+        self.challenged_until = {}  # Домен -> время, до которого запросы идут сразу через cloudscraper
+
+    async def _get(self, url: str, cached: bool = False):
+        """GET через общий пул соединений; cloudscraper подключается, только если сработала защита Cloudflare.
+
+        Домен, где сработала защита, запоминается на CHALLENGE_MEMORY секунд, чтобы не запрашивать
+        каждую страницу дважды.
+        """
+        domain = urlparse(url).netloc
+        if self.challenged_until.get(domain, 0) > time.monotonic():
+            return await asyncio.to_thread(self.scraper.get, url, headers=self.headers, timeout=DEFAULT_TOTAL_TIMEOUT)
+        response = await self.http.get(url, cached=cached)
+        if response.status_code in CHALLENGE_STATUSES:
+            logger.info(f"Код ответа {response.status_code} для {url}, повтор через cloudscraper")
+            self.challenged_until[domain] = time.monotonic() + CHALLENGE_MEMORY
+            response = await asyncio.to_thread(self.scraper.get, url, headers=self.headers, timeout=DEFAULT_TOTAL_TIMEOUT)
+        return response
+
+    async def fetch_page(self, url: str, cached: bool = False):
+        """Ответ с загруженной страницей или None после всех попыток."""
         for attempt in range(self.max_retries):
             try:
-                response = await asyncio.to_thread(self.scraper.get, url, headers=self.headers)
+                response = await self._get(url, cached=cached)
                 if response.status_code == 200:
-                    html_content = response.text
                     if DEBUG_SAVE_HTML:
                         url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
                         debug_filename = f"debug_astar_bz_{url_hash}.html"
                         with open(debug_filename, "w", encoding="utf-8") as f:
-                            f.write(html_content)
+                            f.write(response.text)
                         logger.info(f"HTML страницы {url} сохранён в {debug_filename}")
-                    return html_content
+                    return response
                 logger.warning(f"Попытка {attempt + 1}/{self.max_retries}: Код ответа {response.status_code} для {url}")
             except Exception as e:
                 logger.error(f"Попытка {attempt + 1}/{self.max_retries}: Ошибка при запросе {url}: {e}")
@@ -48,11 +74,15 @@ class AstarBzScraper(BaseScraper):
     async def get_episodes(self, series_url: str, quality: str = None):
         # quality игнорируется, так как Astar.bz не предоставляет варианты качества
         episodes = []
-        html_content = await self.fetch_page(series_url)
-        if not html_content:
+        response = await self.fetch_page(series_url, cached=True)
+        if not response:
             return episodes
+        cached_episodes = self.http.cached_result(response, "episodes")
+        if cached_episodes is not None:
+            logger.info(f"Страница {series_url} не изменилась, используются сохранённые данные")
+            return cached_episodes
 
-        tree = html.fromstring(html_content)
+        tree = html.fromstring(response.text)
         
         # Извлечение названия сериала
         title_elem = tree.xpath('//h1[@itemprop="name"]/text()')
@@ -96,12 +126,13 @@ class AstarBzScraper(BaseScraper):
             })
 
         logger.info(f"Найдено {len(episodes)} эпизодов для {series_url}")
+        self.http.remember_result(response, "episodes", episodes)
         return episodes
 
     async def get_torrent_content(self, torrent_url: str):
         for attempt in range(self.max_retries):
             try:
-                response = await asyncio.to_thread(self.scraper.get, torrent_url, headers=self.headers)
+                response = await self._get(torrent_url)
                 if response.status_code == 200:
                     logger.info(f"Успешно загружен торрент-файл для {torrent_url}")
                     return response.content
@@ -113,11 +144,11 @@ class AstarBzScraper(BaseScraper):
         return None
 
     async def scan_series(self, series_url: str):
-        html_content = await self.fetch_page(series_url)
-        if not html_content:
+        response = await self.fetch_page(series_url)
+        if not response:
             return {"name": "Ошибка", "quality_options": []}
 
-        tree = html.fromstring(html_content)
+        tree = html.fromstring(response.text)
         title_elem = tree.xpath('//h1[@itemprop="name"]/text()')
         series_name = title_elem[0].strip() if title_elem else "Неизвестно"
         names = [name.strip() for name in series_name.split("/")]
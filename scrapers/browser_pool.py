@@ -0,0 +1,175 @@
+import asyncio
+import atexit
+import os
+import threading
+import logging
+from typing import List
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+
+logger = logging.getLogger(__name__)
+
+# Параметры пула по умолчанию
+DEFAULT_MAX_TABS = 3
+DEFAULT_MAX_PAGES = 50  # После стольких страниц Chrome перезапускается
+DEFAULT_MAX_MEMORY_MB = 1500  # Или когда Chrome занял больше памяти
+DEFAULT_PAGE_TIMEOUT = 20  # Максимум секунд на отрисовку страницы во вкладке
+READY_POLL_INTERVAL = 0.25
+
+# Ресурсы, которые не нужны для разбора HTML: блокируются через DevTools в каждой вкладке
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.m4a", "*.ogg", "*.m3u8"
+]
+
+def _process_tree_rss_mb(root_pid: int) -> float:
+    """Суммарный RSS процесса и всех его потомков по /proc (только Linux, иначе 0)."""
+    try:
+        children = {}
+        rss = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", "r") as f:
+                    # Имя процесса в скобках может содержать пробелы, поля считаем после него
+                    fields = f.read().rsplit(")", 1)[1].split()
+                children.setdefault(int(fields[1]), []).append(int(entry))
+                rss[int(entry)] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, IndexError, ValueError):
+                continue
+        total = 0
+        stack = [root_pid]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, []))
+        return total / (1024 * 1024)
+    except OSError:
+        return 0.0
+
+class BrowserPool:
+    """Долгоживущий headless Chrome, в котором страницы грузятся параллельно в отдельных вкладках.
+
+    Команды WebDriver выполняются строго по одной (под блокировкой), но ожидание отрисовки
+    идёт одновременно во всех открытых вкладках. Число вкладок ограничено, браузер
+    перезапускается после max_pages страниц или при превышении max_memory_mb.
+    Страница считается готовой, когда на ней появились все элементы из ready_xpaths.
+    """
+    def __init__(self, chrome_options, service, max_tabs: int = DEFAULT_MAX_TABS, max_pages: int = DEFAULT_MAX_PAGES,
+                 max_memory_mb: float = DEFAULT_MAX_MEMORY_MB, page_timeout: float = DEFAULT_PAGE_TIMEOUT):
+        self.chrome_options = chrome_options
+        self.service = service
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.page_timeout = page_timeout
+        self.driver = None
+        self._base_window = None
+        self._pages_served = 0
+        self._open_tabs = 0
+        self._driver_lock = threading.Lock()
+        self._tab_slots = threading.BoundedSemaphore(max_tabs)
+        atexit.register(self.close)
+
+    def _start_driver(self):
+        self.driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
+        self._base_window = self.driver.current_window_handle
+        self._pages_served = 0
+        logger.info("Selenium driver запущен")
+
+    def _quit_driver(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException as e:
+                logger.warning(f"Ошибка при закрытии Selenium driver: {e}")
+            self.driver = None
+            logger.info("Selenium driver закрыт")
+
+    def _needs_recycle(self) -> bool:
+        if self._pages_served >= self.max_pages:
+            logger.info(f"Selenium driver обслужил {self._pages_served} страниц, перезапуск")
+            return True
+        process = getattr(self.driver.service, "process", None)
+        memory_mb = _process_tree_rss_mb(process.pid) if process else 0.0
+        if memory_mb > self.max_memory_mb:
+            logger.info(f"Selenium driver занимает {memory_mb:.0f} МБ, перезапуск")
+            return True
+        return False
+
+    def _open_tab(self, url: str) -> str:
+        with self._driver_lock:
+            # Перезапускаем браузер только когда в нём нет открытых вкладок
+            if self.driver is not None and self._open_tabs == 0 and self._needs_recycle():
+                self._quit_driver()
+            if self.driver is None:
+                self._start_driver()
+            self.driver.switch_to.new_window('tab')
+            handle = self.driver.current_window_handle
+            # Блокировка действует на вкладку, поэтому включается до начала навигации
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+            # Навигация через JS не ждёт загрузки, поэтому вкладки грузятся параллельно
+            self.driver.execute_script("window.location.href = arguments[0];", url)
+            self.driver.switch_to.window(self._base_window)
+            self._open_tabs += 1
+            self._pages_served += 1
+            return handle
+
+    def _read_tab_if_ready(self, handle: str, ready_xpaths: List[str], force: bool = False):
+        """HTML вкладки, если страница готова (или force), иначе None."""
+        with self._driver_lock:
+            self.driver.switch_to.window(handle)
+            try:
+                if ready_xpaths:
+                    ready = all(self.driver.find_elements(By.XPATH, xpath) for xpath in ready_xpaths)
+                else:
+                    ready = self.driver.execute_script("return document.readyState === 'complete' && location.href !== 'about:blank';")
+                return self.driver.page_source if ready or force else None
+            finally:
+                self.driver.switch_to.window(self._base_window)
+
+    def _close_tab(self, handle: str):
+        with self._driver_lock:
+            self._open_tabs -= 1
+            if self.driver is None:
+                return
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+                self.driver.switch_to.window(self._base_window)
+            except WebDriverException as e:
+                logger.error(f"Ошибка закрытия вкладки, браузер будет перезапущен: {e}")
+                if self._open_tabs == 0:
+                    self._quit_driver()
+
+    async def fetch_page(self, url: str, ready_xpaths: List[str] = None) -> str:
+        """Загружает страницу в отдельной вкладке общего браузера и возвращает её HTML.
+
+        HTML отдаётся сразу, как только найдены все ready_xpaths (или документ загружен,
+        если они не заданы); по истечении page_timeout возвращается то, что успело отрисоваться.
+        """
+        await asyncio.to_thread(self._tab_slots.acquire)
+        try:
+            handle = await asyncio.to_thread(self._open_tab, url)
+            try:
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self.page_timeout
+                while True:
+                    timed_out = loop.time() >= deadline
+                    page_source = await asyncio.to_thread(self._read_tab_if_ready, handle, ready_xpaths, timed_out)
+                    if page_source is not None:
+                        if timed_out:
+                            logger.warning(f"Страница {url} не отрисовалась за {self.page_timeout} с")
+                        return page_source
+                    await asyncio.sleep(READY_POLL_INTERVAL)
+            finally:
+                await asyncio.to_thread(self._close_tab, handle)
+        finally:
+            self._tab_slots.release()
+
+    def close(self):
+        with self._driver_lock:
+            self._quit_driver()
@@ -0,0 +1,151 @@
+import asyncio
+import atexit
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUEST_TIMEOUT = 120  # Страховка на случай, если процесс завис и не ответил
+
+class BrowserWorkerError(Exception):
+    pass
+
+class BrowserWorkerClient:
+    """Асинхронный интерфейс к отдельному процессу с headless-браузером.
+
+    Процесс запускается как `python -m scrapers.browser_worker` при первом запросе и общается
+    построчным JSON через stdin/stdout. Ответы читает фоновый поток и передаёт в futures
+    того цикла событий, из которого пришёл запрос. Если процесс упал, ожидающие запросы
+    завершаются ошибкой, а следующий запрос запускает процесс заново.
+    """
+    def __init__(self, worker_config: dict):
+        self.worker_config = worker_config
+        self._process = None
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._ids = itertools.count(1)
+        atexit.register(self.close)
+
+    def _ensure_process(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "scrapers.browser_worker", json.dumps(self.worker_config)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=PROJECT_ROOT,
+                text=True, encoding="utf-8", bufsize=1
+            )
+            threading.Thread(target=self._read_responses, args=(self._process,), daemon=True, name="browser-worker-reader").start()
+            logger.info(f"Процесс браузера запущен (pid {self._process.pid})")
+
+    def _read_responses(self, process):
+        for line in process.stdout:
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                logger.error(f"Некорректный ответ процесса браузера: {line[:200]}")
+                continue
+            entry = self._pending.pop(message.get("id"), None)
+            if entry:
+                loop, future = entry
+                loop.call_soon_threadsafe(self._resolve, future, message)
+        logger.error(f"Процесс браузера завершился (код {process.wait()})")
+        for request_id in list(self._pending):
+            loop, future = self._pending.pop(request_id)
+            loop.call_soon_threadsafe(self._resolve, future, {"error": "Процесс браузера завершился"})
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, message: dict):
+        if future.done():
+            return
+        if "error" in message:
+            future.set_exception(BrowserWorkerError(message["error"]))
+        else:
+            future.set_result(message["html"])
+
+    async def fetch_page(self, url: str, ready_xpaths: List[str] = None) -> str:
+        """Загружает страницу в процессе браузера и возвращает её HTML."""
+        await asyncio.to_thread(self._ensure_process)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = next(self._ids)
+        self._pending[request_id] = (loop, future)
+        try:
+            with self._lock:
+                self._process.stdin.write(json.dumps({"id": request_id, "url": url, "ready_xpaths": ready_xpaths}) + "\n")
+                self._process.stdin.flush()
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        except (BrokenPipeError, OSError) as e:
+            raise BrowserWorkerError(f"Процесс браузера недоступен: {e}")
+        except asyncio.TimeoutError:
+            raise BrowserWorkerError(f"Процесс браузера не ответил за {REQUEST_TIMEOUT} с")
+        finally:
+            self._pending.pop(request_id, None)
+
+    def close(self):
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                return
+            try:
+                # Закрытие stdin — сигнал процессу закрыть браузер и завершиться
+                self._process.stdin.close()
+                self._process.wait(timeout=15)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+
+def _build_pool(config: dict):
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from scrapers.browser_pool import BrowserPool
+
+    options = Options()
+    for argument in config.get("arguments", []):
+        options.add_argument(argument)
+    if config.get("page_load_strategy"):
+        options.page_load_strategy = config["page_load_strategy"]
+    if config.get("prefs"):
+        options.add_experimental_option("prefs", config["prefs"])
+    service = Service(executable_path=config["driver_path"], log_path=config.get("log_path"))
+    pool_options = {key: config[key] for key in ("max_tabs", "max_pages", "max_memory_mb", "page_timeout") if key in config}
+    return BrowserPool(options, service, **pool_options)
+
+async def _serve(pool):
+    tasks = set()
+
+    async def handle(request):
+        try:
+            html = await pool.fetch_page(request["url"], ready_xpaths=request.get("ready_xpaths"))
+            response = {"id": request["id"], "html": html}
+        except Exception as e:
+            logger.error(f"Ошибка загрузки {request.get('url')}: {e}")
+            response = {"id": request["id"], "error": str(e)}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+    while True:
+        line = await asyncio.to_thread(sys.stdin.readline)
+        if not line:
+            break
+        task = asyncio.create_task(handle(json.loads(line)))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.to_thread(pool.close)
+
+def main():
+    # stdout занят протоколом, логи процесса идут в stderr
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - browser_worker - %(levelname)s - %(message)s', stream=sys.stderr)
+    sys.stdin.reconfigure(encoding="utf-8")
+    sys.stdout.reconfigure(encoding="utf-8")
+    asyncio.run(_serve(_build_pool(json.loads(sys.argv[1]))))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = "http_cache"
+TORRENT_CACHE_DIR = "torrent_cache"
+
+class HttpCache:
+    """Дисковый кэш страниц трекеров для условных запросов.
+
+    Запись хранится по ключу (область, URL), где область отделяет сессии разных
+    аккаунтов. Для записи сохраняются ETag/Last-Modified, тело ответа и его хэш,
+    а также результаты разбора страницы: пока хэш тела не изменился, парсер
+    берёт готовый результат вместо повторного разбора HTML.
+    """
+    def __init__(self, directory: str = HTTP_CACHE_DIR):
+        self.directory = directory
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(scope: str, url: str) -> str:
+        return hashlib.sha1(f"{scope}|{url}".encode()).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def load(self, key: str) -> Optional[dict]:
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            entry = None
+            try:
+                with open(self._path(key, "json"), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.warning(f"Повреждённая запись HTTP-кэша {key}: {e}")
+            self._entries[key] = entry
+            return entry
+
+    def _save(self, key: str, entry: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(key, "json"), "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        self._entries[key] = entry
+
+    def body(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key, "body"), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, key: str, url: str, response) -> str:
+        """Сохраняет ответ 200 и возвращает хэш его тела; при неизменном теле результаты разбора сохраняются."""
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        entry = self.load(key) or {}
+        with self._lock:
+            changed = entry.get("content_hash") != content_hash
+            if changed:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self._path(key, "body"), "wb") as f:
+                    f.write(response.content)
+            self._save(key, {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "charset": response.encoding,
+                "content_hash": content_hash,
+                "results": {} if changed else entry.get("results", {})
+            })
+        return content_hash
+
+    def get_result(self, response, name: str) -> Optional[Any]:
+        """Результат разбора name для этого ответа, если тело страницы не изменилось с момента разбора."""
+        key = getattr(response, "cache_key", None)
+        entry = self.load(key) if key else None
+        if not entry or entry.get("content_hash") != response.content_hash:
+            return None
+        return entry.get("results", {}).get(name)
+
+    def set_result(self, response, name: str, data: Any):
+        key = getattr(response, "cache_key", None)
+        entry = self.load(key) if key else None
+        if not entry or entry.get("content_hash") != response.content_hash:
+            return
+        with self._lock:
+            self._save(key, {**entry, "results": {**entry.get("results", {}), name: data}})
+
+class TorrentFileCache:
+    """Кэш .torrent файлов по ID торрента и дате обновления раздачи.
+
+    Пока дата обновления не изменилась, файл раздачи тот же, и повторное добавление
+    не обращается к трекеру. При сохранении новой версии старые файлы того же ID удаляются.
+    """
+    def __init__(self, directory: str = TORRENT_CACHE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, torrent_id: str, last_updated: str) -> str:
+        version = hashlib.sha1((last_updated or "").encode()).hexdigest()[:12]
+        return os.path.join(self.directory, f"{torrent_id}_{version}.torrent")
+
+    def get(self, torrent_id: str, last_updated: str) -> Optional[bytes]:
+        try:
+            with open(self._path(torrent_id, last_updated), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, torrent_id: str, last_updated: str, content: bytes):
+        path = self._path(torrent_id, last_updated)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for name in os.listdir(self.directory):
+                if name.startswith(f"{torrent_id}_") and os.path.join(self.directory, name) != path:
+                    os.remove(os.path.join(self.directory, name))
+            with open(path, "wb") as f:
+                f.write(content)
+
+_http_cache = HttpCache()
+_torrent_cache = TorrentFileCache()
+
+def get_http_cache() -> HttpCache:
+    return _http_cache
+
+def get_torrent_cache() -> TorrentFileCache:
+    return _torrent_cache
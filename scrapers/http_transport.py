@@ -0,0 +1,181 @@
+import json
+import logging
+from http.cookies import Morsel
+from typing import Dict, List, Optional
+import aiohttp
+from .http_cache import HttpCache, get_http_cache
+
+logger = logging.getLogger(__name__)
+
+# Таймауты обязательны для всех запросов: зависший трекер не должен держать сканирование
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_TOTAL_TIMEOUT = 60
+DEFAULT_POOL_SIZE = 100
+DEFAULT_LIMIT_PER_HOST = 8
+DNS_CACHE_TTL = 300
+
+# aiohttp распаковывает brotli только при установленном модуле, иначе его нельзя запрашивать
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+class HttpResponse:
+    """Прочитанный ответ с теми же полями, что у requests.Response (status_code, url, content, text, encoding)."""
+    def __init__(self, status_code: int, url: str, headers, content: bytes, charset: Optional[str]):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.encoding = charset or "utf-8"
+        # Заполняются для ответов, прошедших через HTTP-кэш
+        self.cache_key: Optional[str] = None
+        self.content_hash: Optional[str] = None
+        self.from_cache = False
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+class HttpTransport:
+    """Общий пул соединений для всех парсеров.
+
+    Соединения и DNS-кэш переиспользуются между парсерами, число одновременных
+    соединений ограничено как в целом, так и на каждый хост: лишние запросы к хосту
+    ждут свободного соединения. Коннектор aiohttp создаётся при первом запросе
+    в цикле событий приложения.
+    """
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, limit_per_host: int = DEFAULT_LIMIT_PER_HOST):
+        self.pool_size = pool_size
+        self.limit_per_host = limit_per_host
+        self._connector: Optional[aiohttp.TCPConnector] = None
+
+    def connector(self) -> aiohttp.TCPConnector:
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.pool_size, limit_per_host=self.limit_per_host,
+                ttl_dns_cache=DNS_CACHE_TTL, keepalive_timeout=60
+            )
+        return self._connector
+
+    @staticmethod
+    async def request(session: aiohttp.ClientSession, method: str, url: str, **kwargs) -> HttpResponse:
+        async with session.request(method, url, **kwargs) as response:
+            content = await response.read()
+            return HttpResponse(response.status, str(response.url), response.headers, content, response.charset)
+
+_transport = HttpTransport()
+
+def get_transport() -> HttpTransport:
+    return _transport
+
+class HttpClient:
+    """HTTP-клиент одного парсера: свои заголовки и cookies поверх общего пула соединений.
+
+    cache_scope включает HTTP-кэш для запросов get(..., cached=True): область отделяет
+    записи разных сессий (например, аккаунтов трекера) для одного и того же URL.
+    """
+    def __init__(self, headers: Dict[str, str] = None, transport: HttpTransport = None,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 total_timeout: float = DEFAULT_TOTAL_TIMEOUT, cache_scope: str = None, cache: HttpCache = None):
+        self.headers = {"Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+        self.transport = transport or get_transport()
+        self.cache_scope = cache_scope
+        self.cache = cache or get_http_cache()
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout, sock_read=read_timeout)
+        self.cookie_jar = None
+        self._imported_cookies: List[dict] = []
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            # Cookie jar переживает пересоздание сессии, поэтому авторизация сохраняется
+            if self.cookie_jar is None:
+                self.cookie_jar = aiohttp.CookieJar()
+                self._load_imported_cookies()
+            self._session = aiohttp.ClientSession(
+                connector=self.transport.connector(), connector_owner=False,
+                cookie_jar=self.cookie_jar, headers=self.headers, timeout=self.timeout
+            )
+        return self._session
+
+    def _load_imported_cookies(self):
+        for cookie in self._imported_cookies:
+            morsel = Morsel()
+            morsel.set(cookie["name"], cookie["value"], cookie["value"])
+            for attribute in ("domain", "path", "expires"):
+                if cookie.get(attribute):
+                    morsel[attribute] = cookie[attribute]
+            self.cookie_jar.update_cookies({cookie["name"]: morsel})
+        self._imported_cookies = []
+
+    def import_cookies(self, cookies: List[dict]):
+        """Подставляет сохранённые cookies; они попадут в jar при первом запросе."""
+        self._imported_cookies = list(cookies or [])
+        if self.cookie_jar is not None:
+            self._load_imported_cookies()
+
+    def clear_cookies(self):
+        self._imported_cookies = []
+        if self.cookie_jar is not None:
+            self.cookie_jar.clear()
+
+    def export_cookies(self) -> List[dict]:
+        if self.cookie_jar is None:
+            return list(self._imported_cookies)
+        return [
+            {"name": morsel.key, "value": morsel.value, "domain": morsel["domain"], "path": morsel["path"], "expires": morsel["expires"]}
+            for morsel in self.cookie_jar
+        ]
+
+    def has_cookie(self, name: str) -> bool:
+        return any(cookie["name"] == name for cookie in self._imported_cookies) or (
+            self.cookie_jar is not None and any(cookie.key == name for cookie in self.cookie_jar)
+        )
+
+    async def get(self, url: str, cached: bool = False, **kwargs) -> HttpResponse:
+        if not cached or not self.cache_scope:
+            return await self.transport.request(self._get_session(), "GET", url, **kwargs)
+        key = self.cache.key(self.cache_scope, url)
+        entry = self.cache.load(key)
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = await self.transport.request(self._get_session(), "GET", url, headers=headers, **kwargs)
+        body = self.cache.body(key) if response.status_code == 304 and entry else None
+        if response.status_code == 304 and body is None:
+            # Тело пропало с диска: повторяем запрос без условий
+            response = await self.transport.request(self._get_session(), "GET", url, **kwargs)
+        if body is not None:
+            response = HttpResponse(200, url, response.headers, body, entry.get("charset"))
+            response.content_hash = entry["content_hash"]
+            response.from_cache = True
+            logger.debug(f"{url} не изменилась (304), используется кэш")
+        elif response.status_code == 200:
+            response.content_hash = self.cache.store(key, url, response)
+        else:
+            return response
+        response.cache_key = key
+        return response
+
+    def cached_result(self, response, name: str):
+        """Ранее сохранённый результат разбора страницы, если её содержимое не изменилось."""
+        return self.cache.get_result(response, name)
+
+    def remember_result(self, response, name: str, data):
+        self.cache.set_result(response, name, data)
+
+    async def post(self, url: str, **kwargs) -> HttpResponse:
+        return await self.transport.request(self._get_session(), "POST", url, **kwargs)
@@ -1,38 +1,36 @@
-import requests
 from lxml import html
 import logging
 from datetime import datetime
 import re
-import asyncio
 import os
+from .http_transport import HttpClient
+from .session_store import TrackerSessionMixin
 
 logger = logging.getLogger(__name__)
 
 # Флаг для включения/отключения сохранения HTML для отладки
 DEBUG_SAVE_HTML = False
 
-class KinozalScraper:
+class KinozalScraper(TrackerSessionMixin):
+    tracker = "kinozal"
+    site = "kinozal.tv"
+    session_cookie = "uid"
+
     def __init__(self, username=None, password=None):
-        self.session = requests.Session()
+        self.http = HttpClient(cache_scope=f"kinozal:{username}")
         self.login_url = "https://kinozal.tv/takelogin.php"
         self.base_download_url = "https://dl.kinozal.tv/download.php?id="
         self.username = username
         self.password = password
-        if username and password:
-            self.login()
+        self.restore_session()
 
-    def login(self):
-        """Авторизация на сайте."""
+    async def submit_login_form(self):
         login_data = {
             "username": self.username,
             "password": self.password,
             "returnto": ""
         }
-        response = self.session.post(self.login_url, data=login_data)
-        response.encoding = "windows-1251"
-        if response.url.startswith(self.login_url) or "uid" not in self.session.cookies:
-            raise Exception("Ошибка авторизации на kinozal.tv")
-        logger.info("Успешная авторизация на kinozal.tv")
+        return await self.http.post(self.login_url, data=login_data)
 
     def get_torrent_id(self, url):
         """Извлечение ID торрента из URL."""
@@ -45,11 +43,14 @@ class KinozalScraper:
         """Получение данных о раздаче с сохранением HTML для отладки, если включено."""
         if not self.username or not self.password:
             raise Exception("Требуется авторизация для kinozal.tv")
-        
-        response = await asyncio.to_thread(self.session.get, series_url)
+        response = await self.fetch("get", series_url, cached=True)
         if response.status_code != 200:
             logger.error(f"Ошибка загрузки страницы {series_url}: {response.status_code}")
             raise Exception(f"Не удалось загрузить страницу: {response.status_code}")
+        episodes = self.http.cached_result(response, "episodes")
+        if episodes is not None:
+            logger.info(f"Страница {series_url} не изменилась, используются сохранённые данные")
+            return episodes
         
         response.encoding = "windows-1251"
         html_content = response.text
@@ -106,20 +107,23 @@ class KinozalScraper:
             last_updated = datetime.strptime(f"{day.zfill(2)}.{month}.{year} {time}", "%d.%m.%Y %H:%M")
         
         torrent_id = self.get_torrent_id(series_url)
-        return [{
+        episodes = [{
             "name": "Полный сезон",
             "torrent_id": torrent_id,
             "torrent_url": series_url,
             "last_updated": last_updated.isoformat()
         }]
+        self.http.remember_result(response, "episodes", episodes)
+        return episodes
 
     async def get_torrent_content(self, torrent_url):
         """Скачивание торрент-файла."""
         torrent_id = self.get_torrent_id(torrent_url)
         download_url = f"{self.base_download_url}{torrent_id}"
         headers = {"Referer": torrent_url}
-        response = await asyncio.to_thread(self.session.get, download_url, headers=headers)
-        if response.status_code == 200:
+        response = await self.fetch("get", download_url, binary=True, headers=headers)
+        # Вместо файла kinozal отдаёт HTML, например при исчерпанном лимите скачиваний
+        if response.status_code == 200 and "text/html" not in response.headers.get("Content-Type", ""):
             logger.info(f"Торрент-файл успешно получен для {torrent_url}")
             return response.content
         logger.error(f"Ошибка скачивания торрента {torrent_url}: {response.status_code}")
@@ -127,7 +131,10 @@ class KinozalScraper:
         
     async def scan_series(self, series_url: str):
         # Этот метод не использует сохранение HTML, поэтому изменений не требуется
-        response = await asyncio.to_thread(self.session.get, series_url)
+        if self.username and self.password:
+            response = await self.fetch("get", series_url)
+        else:
+            response = await self.http.get(series_url)
         if response.status_code != 200:
             return {"name": "Ошибка", "quality_options": []}
 
@@ -1,10 +1,10 @@
-import requests
 from lxml import html
 import logging
 from datetime import datetime
 import re
 import asyncio
 import os
+from .http_transport import HttpClient
 
 logger = logging.getLogger(__name__)
 
@@ -12,12 +12,10 @@ DEBUG_SAVE_HTML = True
 
 class NnmClubScraper:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.http = HttpClient(cache_scope="nnmclub", headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
             "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate, br",
             "Connection": "keep-alive",
             "Referer": "https://nnmclub.to/",
             "Upgrade-Insecure-Requests": "1"
@@ -34,14 +32,18 @@ class NnmClubScraper:
         """Получение данных о раздаче с сохранением HTML для отладки."""
         for attempt in range(3):
             try:
-                response = await asyncio.to_thread(self.session.get, "https://nnmclub.to/")
+                response = await self.http.get("https://nnmclub.to/")
                 if response.status_code != 200:
                     logger.warning(f"Не удалось загрузить главную страницу nnmclub.to: {response.status_code}")
                 
-                response = await asyncio.to_thread(self.session.get, series_url)
+                response = await self.http.get(series_url, cached=True)
                 if response.status_code != 200:
                     logger.error(f"Ошибка загрузки страницы {series_url}: {response.status_code}")
                     raise Exception(f"Не удалось загрузить страницу: {response.status_code}")
+                episodes = self.http.cached_result(response, "episodes")
+                if episodes is not None:
+                    logger.info(f"Страница {series_url} не изменилась, используются сохранённые данные")
+                    return episodes
                 
                 response.encoding = "windows-1251"
                 html_content = response.text
@@ -81,12 +83,14 @@ class NnmClubScraper:
                     raise Exception(f"Ошибка парсинга даты: {e}")
                 
                 torrent_id = self.get_torrent_id(series_url)
-                return [{
+                episodes = [{
                     "name": "Полный сезон",
                     "torrent_id": torrent_id,
                     "magnet_link": magnet_link,
                     "last_updated": last_updated.isoformat()
                 }]
+                self.http.remember_result(response, "episodes", episodes)
+                return episodes
             except Exception as e:
                 logger.error(f"Попытка {attempt + 1}/3: Ошибка для {series_url}: {e}")
                 if attempt == 2:
@@ -103,11 +107,11 @@ class NnmClubScraper:
         """Получение метаданных сериала."""
         for attempt in range(3):
             try:
-                response = await asyncio.to_thread(self.session.get, "https://nnmclub.to/")
+                response = await self.http.get("https://nnmclub.to/")
                 if response.status_code != 200:
                     logger.warning(f"Не удалось загрузить главную страницу nnmclub.to: {response.status_code}")
                 
-                response = await asyncio.to_thread(self.session.get, series_url)
+                response = await self.http.get(series_url)
                 if response.status_code != 200:
                     logger.error(f"Ошибка загрузки страницы {series_url}: {response.status_code}")
                     raise Exception(f"Не удалось загрузить страницу: {response.status_code}")
@@ -0,0 +1,51 @@
+import asyncio
+import re
+import logging
+from typing import Dict, List, Optional
+from .http_transport import HttpClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.rutracker.cc/v1"
+MAX_TOPICS_PER_REQUEST = 100  # Лимит API на число ID в одном запросе
+TOPIC_ID_RE = re.compile(r"t=(\d+)")
+
+def rutracker_topic_id(url: str) -> Optional[str]:
+    match = TOPIC_ID_RE.search(url)
+    return match.group(1) if match else None
+
+class RutrackerTopicApi:
+    """Пакетный запрос данных тем RuTracker (get_tor_topic_data) по их ID.
+
+    Базовый URL настраивается, поэтому вместо api.rutracker.cc можно подставить
+    локальный сервер с тем же форматом ответа.
+    """
+    def __init__(self, base_url: str = DEFAULT_API_URL):
+        self.base_url = base_url.rstrip("/")
+        self.http = HttpClient(headers={"Accept": "application/json"})
+
+    async def _fetch_chunk(self, topic_ids: List[str]) -> Dict[str, Optional[dict]]:
+        response = await self.http.get(
+            f"{self.base_url}/get_tor_topic_data",
+            params={"by": "topic_id", "val": ",".join(topic_ids)}
+        )
+        if response.status_code != 200:
+            raise Exception(f"Код ответа API RuTracker {response.status_code}")
+        return response.json().get("result") or {}
+
+    async def get_topic_data(self, topic_ids: List[str]) -> Dict[str, Optional[dict]]:
+        """Данные тем по ID; для удалённых или неизвестных тем значение None."""
+        chunks = [topic_ids[i:i + MAX_TOPICS_PER_REQUEST] for i in range(0, len(topic_ids), MAX_TOPICS_PER_REQUEST)]
+        results = await asyncio.gather(*(self._fetch_chunk(chunk) for chunk in chunks))
+        data = {}
+        for result in results:
+            data.update(result)
+        return data
+
+    async def get_info_hashes(self, topic_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Текущий info_hash раздачи по ID темы (в нижнем регистре, как у qBittorrent)."""
+        data = await self.get_topic_data(topic_ids)
+        return {
+            topic_id: (data.get(topic_id) or {}).get("info_hash", "").lower() or None
+            for topic_id in topic_ids
+        }
@@ -1,38 +1,42 @@
-import requests
 from lxml import html
 import logging
 from datetime import datetime
 import re
-import asyncio
 import os
+from urllib.parse import urlencode
+from .http_transport import HttpClient
+from .session_store import TrackerSessionMixin
 
 logger = logging.getLogger(__name__)
 
 # Флаг для включения/отключения сохранения HTML для отладки
 DEBUG_SAVE_HTML = False
 
-class RutrackerScraper:
+class RutrackerScraper(TrackerSessionMixin):
+    tracker = "rutracker"
+    site = "rutracker.org"
+    session_cookie = "bb_session"
+
     def __init__(self, username=None, password=None):
-        self.session = requests.Session()
+        self.http = HttpClient(cache_scope=f"rutracker:{username}")
         self.login_url = "https://rutracker.org/forum/login.php"
         self.base_download_url = "https://rutracker.org/forum/dl.php?t="
         self.username = username
         self.password = password
-        if username and password:
-            self.login()
+        self.restore_session()
 
-    def login(self):
-        """Авторизация на сайте."""
+    async def submit_login_form(self):
         login_data = {
-            "login_username": self.username.encode('windows-1251'),
-            "login_password": self.password.encode('windows-1251'),
+            "login_username": self.username,
+            "login_password": self.password,
             "login": "%E2%F5%EE%E4"
         }
-        response = self.session.post(self.login_url, data=login_data)
-        response.encoding = "windows-1251"
-        if response.url.startswith(self.login_url) or "bb_session" not in self.session.cookies:
-            raise Exception("Ошибка авторизации на rutracker.org")
-        logger.info("Успешная авторизация на rutracker.org")
+        # Форма входа ожидает логин и пароль в windows-1251
+        return await self.http.post(
+            self.login_url,
+            data=urlencode(login_data, encoding="windows-1251"),
+            headers={"Content-Type": "application/x-www-form-urlencoded"}
+        )
 
     def get_torrent_id(self, url):
         """Извлечение ID торрента из URL."""
@@ -45,11 +49,14 @@ class RutrackerScraper:
         """Получение данных о раздаче с сохранением HTML для отладки, если включено."""
         if not self.username or not self.password:
             raise Exception("Требуется авторизация для rutracker.org")
-        
-        response = await asyncio.to_thread(self.session.get, series_url)
+        response = await self.fetch("get", series_url, cached=True)
         if response.status_code != 200:
             logger.error(f"Ошибка загрузки страницы {series_url}: {response.status_code}")
             raise Exception(f"Не удалось загрузить страницу: {response.status_code}")
+        episodes = self.http.cached_result(response, "episodes")
+        if episodes is not None:
+            logger.info(f"Страница {series_url} не изменилась, используются сохранённые данные")
+            return episodes
         
         # Принудительно декодируем как windows-1251
         response.encoding = "windows-1251"
@@ -95,17 +102,19 @@ class RutrackerScraper:
                 raise Exception(f"Ошибка парсинга даты: {e}")
         
         torrent_id = self.get_torrent_id(series_url)
-        return [{
+        episodes = [{
             "name": "Полный сезон",
             "torrent_id": torrent_id,
             "torrent_url": f"{self.base_download_url}{torrent_id}",
             "last_updated": last_updated.isoformat()
         }]
+        self.http.remember_result(response, "episodes", episodes)
+        return episodes
 
     async def get_torrent_content(self, torrent_url):
         """Скачивание торрент-файла."""
         headers = {"Referer": "https://rutracker.org/forum/viewtopic.php?t=" + self.get_torrent_id(torrent_url)}
-        response = await asyncio.to_thread(self.session.post, torrent_url, headers=headers)
+        response = await self.fetch("post", torrent_url, binary=True, headers=headers)
         if response.status_code == 200 and "text/html" not in response.headers.get("Content-Type", ""):
             logger.info(f"Торрент-файл успешно получен для {torrent_url}")
             return response.content
@@ -114,7 +123,10 @@ class RutrackerScraper:
         
     async def scan_series(self, series_url: str):
         # Этот метод не использует сохранение HTML, поэтому изменений не требуется
-        response = await asyncio.to_thread(self.session.get, series_url)
+        if self.username and self.password:
+            response = await self.fetch("get", series_url)
+        else:
+            response = await self.http.get(series_url)
         if response.status_code != 200:
             return {"name": "Ошибка", "quality_options": []}
 
@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE_FILE = "tracker_sessions.json"
+
+def session_key(tracker: str, username: str, password: str) -> str:
+    """Ключ сессии аккаунта: смена логина или пароля даёт новую сессию."""
+    password_hash = hashlib.sha256(password.encode()).hexdigest()[:12]
+    return f"{tracker}:{username}:{password_hash}"
+
+class SessionStore:
+    """Cookies авторизованных сессий трекеров на диске, по одной записи на аккаунт.
+
+    Сохранённая сессия считается действительной, пока ответ трекера не покажет
+    обратное, поэтому после перезапуска вход не выполняется заново.
+    """
+    def __init__(self, path: str = SESSION_STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.sessions: Dict[str, List[dict]] = self.load()
+
+    def load(self) -> Dict[str, List[dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Ошибка чтения {self.path}: {e}, сохранённые сессии сброшены")
+            return {}
+
+    def get(self, key: str) -> List[dict]:
+        with self._lock:
+            return list(self.sessions.get(key, []))
+
+    def put(self, key: str, cookies: List[dict]):
+        with self._lock:
+            self.sessions[key] = cookies
+            try:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(self.sessions, f, ensure_ascii=False, indent=4)
+            except OSError as e:
+                logger.error(f"Ошибка сохранения {self.path}: {e}")
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SessionStore()
+        return _session_store
+
+class TrackerSessionMixin(ABC):
+    """Вход на трекер с формой авторизации и сохранением сессии между перезапусками.
+
+    Класс трекера задаёт tracker (ключ в хранилище сессий), site (имя для сообщений),
+    session_cookie (cookie, по которой видно успешный вход) и login_url, а также
+    реализует submit_login_form() — отправку своей формы входа через self.http.
+    Входы выполняются по одному: сканирования, одновременно заметившие истёкшую сессию,
+    ждут первый вход и используют его результат.
+    """
+    tracker = ""
+    site = ""
+    session_cookie = ""
+
+    def restore_session(self):
+        """Подхватывает сохранённую сессию аккаунта; она считается действительной, пока трекер не перенаправит на вход."""
+        self.session_key = session_key(self.tracker, self.username, self.password) if self.username and self.password else None
+        cookies = get_session_store().get(self.session_key) if self.session_key else []
+        self.http.import_cookies(cookies)
+        self.logged_in = bool(cookies)
+        self.session_generation = 0  # Растёт с каждым успешным входом
+        self._login_lock = asyncio.Lock()
+
+    @abstractmethod
+    async def submit_login_form(self):
+        """Отправляет форму входа трекера и возвращает ответ."""
+
+    async def login(self, expired_generation: Optional[int] = None):
+        """Авторизация на сайте.
+
+        expired_generation — поколение сессии, которое вызывающий счёл недействительным;
+        если за время ожидания другой вызов уже вошёл заново, повторный вход не выполняется.
+        """
+        async with self._login_lock:
+            if expired_generation is not None and self.logged_in and self.session_generation != expired_generation:
+                return
+            self.http.clear_cookies()
+            response = await self.submit_login_form()
+            if response.url.startswith(self.login_url) or not self.http.has_cookie(self.session_cookie):
+                self.logged_in = False
+                raise Exception(f"Ошибка авторизации на {self.site}")
+            self.logged_in = True
+            self.session_generation += 1
+            logger.info(f"Успешная авторизация на {self.site}")
+            get_session_store().put(self.session_key, self.http.export_cookies())
+
+    async def ensure_login(self):
+        """Авторизация при первом обращении к сайту."""
+        if not self.logged_in:
+            await self.login(self.session_generation)
+
+    def session_expired(self, response, binary: bool = False) -> bool:
+        """Трекер перенаправил на страницу входа или вместо файла отдал HTML."""
+        if "login.php" in response.url:
+            return True
+        return binary and response.status_code == 200 and "text/html" in response.headers.get("Content-Type", "")
+
+    async def fetch(self, method: str, url: str, binary: bool = False, **kwargs):
+        """Запрос от имени аккаунта: при истёкшей сессии один раз входит заново и повторяет запрос."""
+        await self.ensure_login()
+        generation = self.session_generation
+        response = await getattr(self.http, method)(url, **kwargs)
+        if self.session_expired(response, binary):
+            logger.info(f"Сессия {self.site} истекла, повторная авторизация")
+            await self.login(generation)
+            response = await getattr(self.http, method)(url, **kwargs)
+        return response
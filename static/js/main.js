@@ -79,16 +79,158 @@ function setRowProcessing(row) {
 
 function resetRow(row) {
   row.classList.remove('bg-warning', 'bg-success', 'bg-danger');
-  const statusCell = row.querySelector('.status');
-  statusCell.textContent = 'Ожидание';
+  applySummary(row);
   const actionButtons = row.querySelectorAll('.actions .btn');
   actionButtons.forEach(btn => btn.removeAttribute('disabled'));
 }
 
+// Краткий статус сериалов из /api/status_all, который показывают строки таблицы вне сканирования
+const seriesSummaries = {};
+let dashboardTimer = null;
+
+function summaryText(summary) {
+  if (!summary || !summary.scanned_at) return 'Ожидание';
+  let text = `Скачано ${summary.downloaded}/${summary.total}`;
+  if (summary.downloading) text += `, в работе ${summary.downloading}`;
+  if (summary.new) text += `, новых ${summary.new}`;
+  if (summary.errors) text += `, ошибок ${summary.errors}`;
+  return text;
+}
+
+function applySummary(row) {
+  const summary = seriesSummaries[row.dataset.url];
+  const statusCell = row.querySelector('.status');
+  statusCell.textContent = summaryText(summary);
+  statusCell.title = summary && summary.scanned_at ? `Сканирование: ${summary.scanned_at.replace('T', ' ')}` : '';
+}
+
+function loadDashboard() {
+  // Ответ с ETag: при повторной загрузке браузер перепроверяет его и получает 304 без тела
+  fetch('/api/status_all')
+    .then(response => response.json())
+    .then(data => {
+      if (data.error) {
+        console.error('Ошибка получения статуса сериалов:', data.error);
+        return;
+      }
+      Object.assign(seriesSummaries, data.series);
+      document.querySelectorAll('tr[data-url]').forEach(row => {
+        // Строки в процессе сканирования или с открытым окном статуса обновятся по завершении
+        if (!row.classList.contains('bg-warning')) applySummary(row);
+      });
+    })
+    .catch(error => console.error('Ошибка запроса статуса сериалов:', error));
+}
+
+function scheduleDashboardRefresh() {
+  // Снимки приходят пачкой во время цикла мониторинга: одно обновление таблицы на всю пачку
+  clearTimeout(dashboardTimer);
+  dashboardTimer = setTimeout(loadDashboard, 2000);
+}
+
+// Сериал, чьё окно статуса сейчас открыто: его снимок перезагружается при обновлении на сервере
+let openStatusUrl = null;
+
+socket.on('status_snapshot', function(data) {
+  scheduleDashboardRefresh();
+  if (data.series_url !== openStatusUrl) return;
+  if (data.error) {
+    const freshness = document.getElementById('status-freshness');
+    if (freshness) {
+      freshness.innerHTML = `<span class="text-danger">Не удалось обновить данные: ${data.error}</span>`;
+    } else {
+      document.getElementById('status-content').innerHTML = `<p class="text-danger">${data.error}</p>`;
+    }
+    return;
+  }
+  loadStatus(data.series_url);
+});
+
+function formatFreshness(freshness) {
+  const minutes = Math.floor(freshness.age / 60);
+  const age = minutes > 0 ? `${minutes} мин назад` : 'только что';
+  let text = `Данные на ${freshness.scanned_at.replace('T', ' ')} (${age})`;
+  if (freshness.refreshing) {
+    text += ' <span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> обновляются...';
+  } else if (freshness.stale) {
+    text += ', устарели';
+  }
+  return `<p id="status-freshness" class="text-muted small">${text}</p>`;
+}
+
+function loadStatus(seriesUrl) {
+  console.log(`Отправка запроса на /api/status/${encodeURIComponent(seriesUrl)}`);
+  fetch(`/api/status/${encodeURIComponent(seriesUrl)}`)
+    .then(response => {
+      console.log('Ответ от сервера получен');
+      return response.json();
+    })
+    .then(data => {
+      if (seriesUrl !== openStatusUrl) return;
+      if (data.error) {
+        document.getElementById('status-content').innerHTML = `<p class="text-danger">${data.error}</p>`;
+      } else if (data.pending) {
+        // Снимка ещё нет: окно обновится по событию status_snapshot
+        document.getElementById('status-content').innerHTML = '<div class="text-center"><span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Сбор данных с трекера...</div>';
+      } else {
+        renderStatus(seriesUrl, data);
+      }
+    })
+    .catch(error => {
+      console.error('Ошибка запроса:', error);
+      document.getElementById('status-content').innerHTML = `<p class="text-danger">Ошибка загрузки данных</p>`;
+    });
+}
+
+function renderStatus(seriesUrl, data) {
+  let html = formatFreshness(data.freshness);
+  html += `<p>Всего: ${data.status_data.total}</p><p>Скачано: <span class="text-success">${data.status_data.downloaded}</span></p><p>Новых: <span class="text-primary">${data.status_data.new}</span></p>`;
+  html += '<table class="table"><thead><tr><th>Название</th><th>Дата</th><th>ID</th><th>Статус</th></tr></thead><tbody>';
+  data.status_data.episodes.forEach(ep => {
+    const statusClass = ep.status === 'Скачан' || ep.status.includes('Скачан') ? 'text-success' : 
+                       ep.status === 'Загружается' ? 'text-warning' : 
+                       ep.status === 'Ошибка' ? 'text-danger' : 'text-primary';
+    html += `<tr><td>${ep.name}</td><td>${ep.date}</td><td>${ep.torrent_id}</td><td class="${statusClass}">${ep.status}</td></tr>`;
+  });
+  html += '</tbody></table>';
+  if (data.can_rename) {
+    html += '<h6>Предпросмотр переименования</h6><table class="table"><thead><tr><th>Текущее имя</th><th>Новое имя</th></tr></thead><tbody>';
+    data.rename_preview.forEach(item => {
+      html += `<tr><td>${item.current_name}</td><td>${item.new_name}</td></tr>`;
+    });
+    html += '</tbody></table>';
+    html += '<form id="rename-form"><div class="mb-3"><label>Название сериала</label><input type="text" name="series_name" class="form-control" value="' + data.series_data.series_name + '" required></div>';
+    html += '<div class="mb-3"><label>Сезон</label><input type="text" name="season" class="form-control" value="' + data.series_data.season + '" required></div>';
+    html += '<button type="submit" class="btn btn-success">Принять</button></form>';
+  }
+  document.getElementById('status-content').innerHTML = html;
+  if (data.can_rename) {
+    document.getElementById('rename-form').addEventListener('submit', function(e) {
+      e.preventDefault();
+      const formData = new FormData(this);
+      fetch(`/api/status/${encodeURIComponent(seriesUrl)}`, {
+        method: 'POST',
+        body: formData
+      })
+      .then(response => response.json())
+      .then(data => {
+        if (data.error) {
+          showToast(data.error, 'danger');
+        } else {
+          showToast(data.message, 'success');
+          bootstrap.Modal.getInstance(document.getElementById('statusModal')).hide();
+        }
+      })
+      .catch(error => showToast('Ошибка при переименовании', 'danger'));
+    });
+  }
+}
+
 document.addEventListener('DOMContentLoaded', function() {
   document.querySelectorAll('tr[data-url]').forEach(row => {
     resetRow(row);
   });
+  loadDashboard();
 
   document.querySelectorAll('.delete-btn').forEach(btn => {
     btn.addEventListener('click', function() {
@@ -108,66 +250,12 @@ document.addEventListener('DOMContentLoaded', function() {
       document.getElementById('status-content').innerHTML = '<div class="text-center"><span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Загрузка...</div>';
       const modal = new bootstrap.Modal(document.getElementById('statusModal'));
       modal.show();
-
-      console.log(`Отправка запроса на /api/status/${encodeURIComponent(seriesUrl)}`);
-      fetch(`/api/status/${encodeURIComponent(seriesUrl)}`)
-        .then(response => {
-          console.log('Ответ от сервера получен');
-          return response.json();
-        })
-        .then(data => {
-          if (data.error) {
-            document.getElementById('status-content').innerHTML = `<p class="text-danger">${data.error}</p>`;
-          } else {
-            let html = `<p>Всего: ${data.status_data.total}</p><p>Скачано: <span class="text-success">${data.status_data.downloaded}</span></p><p>Новых: <span class="text-primary">${data.status_data.new}</span></p>`;
-            html += '<table class="table"><thead><tr><th>Название</th><th>Дата</th><th>ID</th><th>Статус</th></tr></thead><tbody>';
-            data.status_data.episodes.forEach(ep => {
-              const statusClass = ep.status === 'Скачан' || ep.status.includes('Скачан') ? 'text-success' : 
-                                 ep.status === 'Загружается' ? 'text-warning' : 
-                                 ep.status === 'Ошибка' ? 'text-danger' : 'text-primary';
-              html += `<tr><td>${ep.name}</td><td>${ep.date}</td><td>${ep.torrent_id}</td><td class="${statusClass}">${ep.status}</td></tr>`;
-            });
-            html += '</tbody></table>';
-            if (data.can_rename) {
-              html += '<h6>Предпросмотр переименования</h6><table class="table"><thead><tr><th>Текущее имя</th><th>Новое имя</th></tr></thead><tbody>';
-              data.rename_preview.forEach(item => {
-                html += `<tr><td>${item.current_name}</td><td>${item.new_name}</td></tr>`;
-              });
-              html += '</tbody></table>';
-              html += '<form id="rename-form"><div class="mb-3"><label>Название сериала</label><input type="text" name="series_name" class="form-control" value="' + data.series_data.series_name + '" required></div>';
-              html += '<div class="mb-3"><label>Сезон</label><input type="text" name="season" class="form-control" value="' + data.series_data.season + '" required></div>';
-              html += '<button type="submit" class="btn btn-success">Принять</button></form>';
-            }
-            document.getElementById('status-content').innerHTML = html;
-            if (data.can_rename) {
-              document.getElementById('rename-form').addEventListener('submit', function(e) {
-                e.preventDefault();
-                const formData = new FormData(this);
-                fetch(`/api/status/${encodeURIComponent(seriesUrl)}`, {
-                  method: 'POST',
-                  body: formData
-                })
-                .then(response => response.json())
-                .then(data => {
-                  if (data.error) {
-                    showToast(data.error, 'danger');
-                  } else {
-                    showToast(data.message, 'success');
-                    bootstrap.Modal.getInstance(document.getElementById('statusModal')).hide();
-                  }
-                })
-                .catch(error => showToast('Ошибка при переименовании', 'danger'));
-              });
-            }
-            document.getElementById('statusModal').addEventListener('hidden.bs.modal', function() {
-              if (row) resetRow(row);
-            }, { once: true });
-          }
-        })
-        .catch(error => {
-          console.error('Ошибка запроса:', error);
-          document.getElementById('status-content').innerHTML = `<p class="text-danger">Ошибка загрузки данных</p>`;
-        });
+      openStatusUrl = seriesUrl;
+      document.getElementById('statusModal').addEventListener('hidden.bs.modal', function() {
+        openStatusUrl = null;
+        if (row) resetRow(row);
+      }, { once: true });
+      loadStatus(seriesUrl);
     });
   });
 
@@ -183,6 +271,8 @@ document.addEventListener('DOMContentLoaded', function() {
         .then(data => {
           if (data.status === 'started') {
             showToast('Сканирование запущено', 'info');
+          } else if (data.status === 'already_queued') {
+            showToast('Сканирование уже в очереди', 'info');
           }
         })
         .catch(error => {
@@ -240,6 +330,43 @@ document.addEventListener('DOMContentLoaded', function() {
   });
 });
 
+// Ожидающие предпросмотра URL: ID задания -> обработчики его завершения
+const previewWaiters = {};
+
+socket.on('scan_url_result', function(job) {
+  (previewWaiters[job.job_id] || []).forEach(finish => finish(job));
+});
+
+function waitForPreview(job) {
+  return new Promise(resolve => {
+    if (job.status === 'done' || job.status === 'error') {
+      resolve(job);
+      return;
+    }
+    let finished = false;
+    let pollTimer = null;
+    const finish = result => {
+      if (finished) return;
+      finished = true;
+      clearInterval(pollTimer);
+      previewWaiters[job.job_id] = (previewWaiters[job.job_id] || []).filter(f => f !== finish);
+      if (!previewWaiters[job.job_id].length) delete previewWaiters[job.job_id];
+      resolve(result);
+    };
+    previewWaiters[job.job_id] = (previewWaiters[job.job_id] || []).concat(finish);
+    // Опрос на случай, если событие Socket.IO потерялось при переподключении
+    pollTimer = setInterval(() => {
+      fetch(`/api/scan_url/${job.job_id}`)
+        .then(response => response.json())
+        .then(result => {
+          if (result.status === 'done' || result.status === 'error') finish(result);
+          else if (!result.status) finish(result);
+        })
+        .catch(error => console.error('Ошибка опроса задания предпросмотра:', error));
+    }, 3000);
+  });
+}
+
 document.getElementById('series_url').addEventListener('input', function() {
   const seriesUrl = this.value.trim();
   console.log('Введённый URL:', seriesUrl);
@@ -259,13 +386,20 @@ document.getElementById('series_url').addEventListener('input', function() {
       body: JSON.stringify({ series_url: seriesUrl })
     })
       .then(response => response.json())
-      .then(data => {
-        console.log('Полученные данные от /api/scan_url:', data);
-        if (data.error) {
-          showToast(data.error, 'danger');
-          this.parentElement.removeChild(spinner);
+      .then(job => job.error && !job.job_id ? job : waitForPreview(job))
+      .then(job => {
+        console.log('Полученные данные от /api/scan_url:', job);
+        if (this.value.trim() !== seriesUrl) {
+          // URL изменился, пока страница разбиралась: результат уже не нужен
+          spinner.remove();
+          return;
+        }
+        if (job.error) {
+          showToast(job.error, 'danger');
+          spinner.remove();
           return;
         }
+        const data = job.result;
 
         let domain = '';
         try {
@@ -378,12 +512,12 @@ document.getElementById('series_url').addEventListener('input', function() {
 
         dynamicFields.innerHTML = fieldsHtml;
         document.getElementById('torrent_ids').value = data.torrent_ids.join(',');
-        this.parentElement.removeChild(spinner);
+        spinner.remove();
       })
       .catch(error => {
         console.error('Ошибка сканирования URL:', error);
         showToast('Ошибка при сканировании URL', 'danger');
-        this.parentElement.removeChild(spinner);
+        spinner.remove();
       });
     }
 });
@@ -0,0 +1,55 @@
+"""Локальная замена api.rutracker.cc для тестов и замеров.
+
+Отвечает на get_tor_topic_data в формате настоящего API: {"result": {ID: данные или null}}.
+Запуск отдельно: python -m tests.rutracker_api_server --topics 5000 --port 8089,
+затем "rutracker_api_url": "http://127.0.0.1:8089/v1" в настройках.
+"""
+import argparse
+import hashlib
+from typing import Dict, List, Optional
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+class RutrackerApiStandIn:
+    def __init__(self, topics: Dict[str, Optional[str]] = None, fail: bool = False):
+        self.topics = dict(topics or {})  # ID темы -> info_hash; None — тема удалена
+        self.fail = fail
+        self.requests: List[List[str]] = []
+        self.app = web.Application()
+        self.app.router.add_get("/v1/get_tor_topic_data", self.get_tor_topic_data)
+        self.server: Optional[TestServer] = None
+
+    async def get_tor_topic_data(self, request: web.Request) -> web.Response:
+        if self.fail:
+            return web.json_response({"error": {"code": 500, "text": "Internal error"}}, status=500)
+        topic_ids = request.query["val"].split(",")
+        self.requests.append(topic_ids)
+        result = {
+            topic_id: {"info_hash": self.topics[topic_id].upper(), "forum_id": 189, "tor_status": 2}
+            if self.topics.get(topic_id) else None
+            for topic_id in topic_ids
+        }
+        return web.json_response({"result": result})
+
+    async def __aenter__(self):
+        self.server = TestServer(self.app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.close()
+
+    @property
+    def base_url(self) -> str:
+        return str(self.server.make_url("/v1"))
+
+def fake_info_hash(topic_id: str) -> str:
+    return hashlib.sha1(topic_id.encode()).hexdigest()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    topics = {str(topic_id): fake_info_hash(str(topic_id)) for topic_id in range(1, args.topics + 1)}
+    web.run_app(RutrackerApiStandIn(topics).app, host="127.0.0.1", port=args.port)
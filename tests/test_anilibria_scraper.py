@@ -0,0 +1,73 @@
+"""Быстрый путь Anilibria (JSON API) против разбора страницы в браузере.
+
+Фикстуры описывают один и тот же релиз: anilibria_release.json — в формате отладочного
+дампа fetch_release_data (DEBUG_SAVE_HTML), anilibria_release.html — отрисованная страница
+торрентов. Совпадение torrent_id важно: при расхождении строки качества сериалы без
+фильтра качества получили бы новые ID и были бы добавлены заново.
+"""
+import json
+import os
+import time
+import pytest
+from scrapers.anilibria_scraper import (
+    parse_release_data, parse_release_page, parse_release_quality_options, release_alias, torrent_quality_text
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SERIES_URL = "https://anilibria.top/anime/releases/release/ore-dake-level-up-na-ken-season-2/torrents"
+
+@pytest.fixture(autouse=True)
+def moscow_time(monkeypatch):
+    # Страница показывает даты в часовом поясе браузера, API — в UTC
+    monkeypatch.setenv("TZ", "Europe/Moscow")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+@pytest.fixture
+def api_data():
+    with open(os.path.join(FIXTURES, "anilibria_release.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    return data["release"], data["torrents"]
+
+@pytest.fixture
+def page_html():
+    with open(os.path.join(FIXTURES, "anilibria_release.html"), encoding="utf-8") as f:
+        return f.read()
+
+def test_release_alias():
+    assert release_alias(SERIES_URL) == "ore-dake-level-up-na-ken-season-2"
+    assert release_alias("https://anilibria.top/anime/catalog") is None
+
+def test_quality_text_matches_page_format(api_data):
+    _, torrents = api_data
+    assert [torrent_quality_text(t) for t in torrents] == ["1080p WEBRip AVC", "1080p WEBRip HEVC", "720p WEBRip AVC"]
+
+def test_api_episodes_match_page_episodes(api_data, page_html):
+    from_api = parse_release_data(SERIES_URL, *api_data)
+    from_page = parse_release_page(SERIES_URL, page_html)
+    assert from_api == from_page
+    assert from_api[0] == {
+        "name": "Поднятие уровня в одиночку",
+        "torrent_url": SERIES_URL,
+        "torrent_id": from_page[0]["torrent_id"],
+        "magnet_link": "magnet:?xt=urn:btih:5d41402abc4b2a76b9719d911017c592aabbccdd&dn=Ore_dake_Level_Up_na_Ken_S2_1080p",
+        "quality": "1080p WEBRip AVC",
+        "last_updated": "2025-03-30T18:21:43"
+    }
+
+def test_quality_filter_matches_page(api_data, page_html):
+    from_api = parse_release_data(SERIES_URL, *api_data, quality="1080p WEBRip HEVC")
+    assert from_api == parse_release_page(SERIES_URL, page_html, quality="1080p WEBRip HEVC")
+    assert len(from_api) == 1
+
+def test_quality_options(api_data):
+    assert parse_release_quality_options(*api_data) == {
+        "name": "Поднятие уровня в одиночку",
+        "quality_options": [
+            {"link": "", "quality": "1080p WEBRip AVC"},
+            {"link": "", "quality": "1080p WEBRip HEVC"},
+            {"link": "", "quality": "720p WEBRip AVC"}
+        ]
+    }
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+from scrapers.astar_bz_scraper import AstarBzScraper
+
+class FakeHttp:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.urls = []
+
+    async def get(self, url, cached=False):
+        self.urls.append(url)
+        return SimpleNamespace(status_code=self.status_code, url=url)
+
+class FakeCloudscraper:
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.urls.append(url)
+        return SimpleNamespace(status_code=200, url=url)
+
+def make_scraper(status_code):
+    scraper = AstarBzScraper()
+    scraper.http = FakeHttp(status_code)
+    scraper.scraper = FakeCloudscraper()
+    return scraper
+
+def test_challenged_domain_goes_straight_to_cloudscraper():
+    scraper = make_scraper(403)
+    urls = ["https://v6.astar.bz/anime/1", "https://v6.astar.bz/anime/2", "https://v6.astar.bz/anime/3"]
+
+    async def fetch_all():
+        for url in urls:
+            await scraper._get(url)
+
+    asyncio.run(fetch_all())
+    assert scraper.http.urls == urls[:1]
+    assert scraper.scraper.urls == urls
+
+def test_unprotected_domain_uses_connection_pool():
+    scraper = make_scraper(200)
+
+    async def fetch_twice():
+        await scraper._get("https://v6.astar.bz/anime/1")
+        await scraper._get("https://v6.astar.bz/anime/2")
+
+    asyncio.run(fetch_twice())
+    assert len(scraper.http.urls) == 2
+    assert scraper.scraper.urls == []
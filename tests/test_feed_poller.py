@@ -0,0 +1,122 @@
+import asyncio
+import os
+import pytest
+from feed_poller import FeedEntry, FeedPoller, is_newer, parse_feed, topic_key
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+RUTRACKER_UPDATED = "https://rutracker.org/forum/viewtopic.php?t=6543210"
+RUTRACKER_QUIET = "https://rutracker.org/forum/viewtopic.php?t=6500001"
+RUTRACKER_OTHER = "https://rutracker.org/forum/viewtopic.php?t=6000000"
+KINOZAL_SERIES = "https://kinozal.tv/details.php?id=2090001"
+OTHER_TRACKER = "https://nnmclub.to/forum/viewtopic.php?t=1700000"
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+def make_poller(feeds: dict, full_scan_every: int = 12) -> FeedPoller:
+    poller = FeedPoller({"feeds": feeds, "feed_full_scan_every": full_scan_every})
+    fixtures = {}
+    for urls in feeds.values():
+        for url in urls:
+            fixtures[url] = url.rsplit("/", 1)[-1]
+
+    async def fetch_feed(feed_url):
+        if fixtures[feed_url] == "unavailable.xml":
+            raise Exception("Код ответа 503")
+        return parse_feed(load_fixture(fixtures[feed_url]))
+
+    poller.fetch_feed = fetch_feed
+    return poller
+
+def select(poller: FeedPoller, series_urls):
+    return asyncio.run(poller.select_series(series_urls))
+
+def test_parse_atom_feed():
+    entries = parse_feed(load_fixture("rutracker_atom.xml"))
+    assert entries == [
+        FeedEntry(RUTRACKER_UPDATED, "2026-10-18T09:30:00+00:00"),
+        FeedEntry(RUTRACKER_QUIET, "2026-10-17T21:05:00+00:00"),
+        FeedEntry(RUTRACKER_UPDATED, "2026-10-11T09:10:00+00:00"),
+    ]
+
+def test_parse_rss_feed_uses_guid_and_skips_entries_without_link():
+    entries = parse_feed(load_fixture("kinozal_rss.xml"))
+    assert entries == [
+        FeedEntry(KINOZAL_SERIES, "Sat, 18 Oct 2026 08:15:00 +0300"),
+        FeedEntry("https://kinozal.tv/details.php?id=2090002", "Fri, 17 Oct 2026 19:40:00 +0300"),
+    ]
+
+@pytest.mark.parametrize("url, key", [
+    (RUTRACKER_UPDATED, ("rutracker.org", "6543210")),
+    ("https://kinozal.me/details.php?id=2090001", ("kinozal.tv", "2090001")),
+    ("https://v6.kinozal.tv/details.php?sid=1&id=2090001", ("kinozal.tv", "2090001")),
+    ("https://rutracker.org/forum/index.php", None),
+])
+def test_topic_key(url, key):
+    assert topic_key(url) == key
+
+def test_is_newer_compares_parsed_dates():
+    assert is_newer("2026-10-18T12:30:00+03:00", "2026-10-18T09:00:00+00:00")
+    assert not is_newer("2026-10-18T12:30:00+03:00", "2026-10-18T09:31:00Z")
+    assert is_newer("Sat, 18 Oct 2026 08:15:00 +0300", "Fri, 17 Oct 2026 19:40:00 +0300")
+    assert not is_newer("вчера", "2026-10-18T09:00:00+00:00")
+    assert is_newer("2026-10-18T09:00:00+00:00", "вчера")
+
+def test_poll_picks_newest_entry_regardless_of_order():
+    feed_url = "https://feed.rutracker.cc/atom/f/rutracker_atom_unordered.xml"
+    poller = make_poller({"rutracker.org": [feed_url]})
+    latest = asyncio.run(poller.poll("rutracker.org", [feed_url]))
+    assert latest == {
+        ("rutracker.org", "6543210"): "2026-10-18T12:30:00+03:00",
+        ("rutracker.org", "6500001"): "2026-10-17T21:05:00+00:00",
+    }
+
+def test_without_feeds_all_series_are_scanned():
+    poller = FeedPoller({"feeds": {}})
+    assert select(poller, [RUTRACKER_UPDATED, KINOZAL_SERIES]) == [RUTRACKER_UPDATED, KINOZAL_SERIES]
+
+def test_first_cycle_is_full_scan_then_only_updated_topics():
+    poller = make_poller({"rutracker.org": ["https://feed.rutracker.cc/atom/f/rutracker_atom.xml"]})
+    series = [RUTRACKER_UPDATED, RUTRACKER_QUIET, RUTRACKER_OTHER, OTHER_TRACKER]
+    assert select(poller, series) == series
+    for url in series:
+        poller.mark_scanned(url)
+    # Ленты не изменились: сканируются только сериалы доменов без лент
+    assert select(poller, series) == [OTHER_TRACKER]
+
+def test_newer_feed_timestamp_selects_topic():
+    poller = make_poller({"rutracker.org": ["https://feed.rutracker.cc/atom/f/rutracker_atom.xml"]})
+    select(poller, [RUTRACKER_UPDATED, RUTRACKER_QUIET])
+    poller.mark_scanned(RUTRACKER_QUIET)
+    # Самая новая запись темы в ленте определяет её отметку
+    poller.seen[("rutracker.org", "6543210")] = "2026-10-11T09:10:00+00:00"
+    assert select(poller, [RUTRACKER_UPDATED, RUTRACKER_QUIET]) == [RUTRACKER_UPDATED]
+
+def test_topic_stays_selected_until_scan_succeeds():
+    poller = make_poller({"kinozal.tv": ["https://kinozal.tv/rss/kinozal_rss.xml"]})
+    select(poller, [KINOZAL_SERIES])
+    # Сканирование не удалось: mark_scanned не вызывался
+    assert select(poller, [KINOZAL_SERIES]) == [KINOZAL_SERIES]
+    poller.mark_scanned(KINOZAL_SERIES)
+    assert select(poller, [KINOZAL_SERIES]) == []
+
+def test_full_scan_every_n_cycles():
+    poller = make_poller({"kinozal.tv": ["https://kinozal.tv/rss/kinozal_rss.xml"]}, full_scan_every=3)
+    results = []
+    for _ in range(4):
+        results.append(select(poller, [KINOZAL_SERIES]))
+        poller.mark_scanned(KINOZAL_SERIES)
+    assert results == [[KINOZAL_SERIES], [], [], [KINOZAL_SERIES]]
+
+def test_unavailable_feed_scans_whole_domain():
+    poller = make_poller({
+        "rutracker.org": ["https://feed.rutracker.cc/atom/f/rutracker_atom.xml", "https://feed.rutracker.cc/atom/f/unavailable.xml"],
+        "kinozal.tv": ["https://kinozal.tv/rss/kinozal_rss.xml"],
+    })
+    series = [RUTRACKER_UPDATED, RUTRACKER_OTHER, KINOZAL_SERIES]
+    select(poller, series)
+    for url in series:
+        poller.mark_scanned(url)
+    assert select(poller, series) == [RUTRACKER_UPDATED, RUTRACKER_OTHER]
@@ -0,0 +1,37 @@
+import pytest
+from qbittorrent_manager import map_reused_files, split_root
+
+@pytest.mark.parametrize("path, expected", [
+    ("Show S01 (1-6)/Show.S01E01.mkv", ("Show S01 (1-6)", "Show.S01E01.mkv")),
+    ("Show S01/Extras/Show.S01.Extra.mkv", ("Show S01", "Extras/Show.S01.Extra.mkv")),
+    ("Show.S01E01.mkv", ("", "Show.S01E01.mkv")),
+])
+def test_split_root(path, expected):
+    assert split_root(path) == expected
+
+def test_same_files_under_renamed_root_folder_are_reused():
+    new_files = [("Show S01 (1-6)/Show.S01E01.1080p.mkv", 100), ("Show S01 (1-6)/Show.S01E06.1080p.mkv", 600)]
+    old_files = [("Show S01 (1-5)/Show.S01E01.1080p.mkv", 100), ("Show S01 (1-5)/Show.S01E05.1080p.mkv", 500)]
+    assert map_reused_files(new_files, old_files, "Show", "s01") == {
+        "Show S01 (1-6)/Show.S01E01.1080p.mkv": "Show S01 (1-5)/Show.S01E01.1080p.mkv"
+    }
+
+def test_files_already_renamed_by_template_are_reused():
+    new_files = [("Show S01/Show.S01E02.1080p.mkv", 200)]
+    old_files = [("Show S01/Show s01e02 1080p.mkv", 200)]
+    assert map_reused_files(new_files, old_files, "Show", "s01") == {
+        "Show S01/Show.S01E02.1080p.mkv": "Show S01/Show s01e02 1080p.mkv"
+    }
+
+def test_changed_size_is_not_reused():
+    assert map_reused_files([("Show/Show.S01E01.mkv", 101)], [("Show/Show.S01E01.mkv", 100)], "Show", "s01") == {}
+
+def test_old_file_is_reused_only_once():
+    new_files = [("A/Show.S01E01.mkv", 100), ("A/Show s01e01.mkv", 100)]
+    old_files = [("B/Show s01e01.mkv", 100)]
+    assert list(map_reused_files(new_files, old_files, "Show", "s01").values()) == ["B/Show s01e01.mkv"]
+
+def test_single_file_torrent():
+    assert map_reused_files([("Show.S01E01.mkv", 100)], [("Show.S01E01.mkv", 100)], "Show", "s01") == {
+        "Show.S01E01.mkv": "Show.S01E01.mkv"
+    }
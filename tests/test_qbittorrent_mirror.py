@@ -0,0 +1,40 @@
+import asyncio
+from qbittorrent_mirror import QBittorrentMirror
+
+class FakeClient:
+    """sync/maindata, который отвечает на первый запрос медленнее второго."""
+    def __init__(self):
+        self.requested_rids = []
+
+    async def sync_maindata(self, rid=0):
+        self.requested_rids.append(rid)
+        call = len(self.requested_rids)
+        await asyncio.sleep(0.05 if call == 1 else 0.01)
+        return {"rid": rid + 1, "full_update": rid == 0, "torrents": {"abc": {"state": f"state{call}"}}}
+
+def test_overlapping_refreshes_run_one_after_another():
+    client = FakeClient()
+    mirror = QBittorrentMirror(client)
+
+    async def refresh_twice():
+        await asyncio.gather(mirror.refresh(), mirror.refresh())
+
+    asyncio.run(refresh_twice())
+    assert client.requested_rids == [0, 1]
+    assert mirror.rid == 2
+    assert mirror.get("abc")["state"] == "state2"
+
+def test_response_with_old_rid_is_dropped():
+    mirror = QBittorrentMirror(FakeClient())
+    mirror.apply({"rid": 5, "full_update": True, "torrents": {"abc": {"state": "uploading"}}})
+    mirror.apply({"rid": 3, "torrents": {"abc": {"state": "downloading"}}, "torrents_removed": ["abc"]})
+    assert mirror.rid == 5
+    assert mirror.get("abc")["state"] == "uploading"
+
+def test_full_update_resets_table():
+    mirror = QBittorrentMirror(FakeClient())
+    mirror.apply({"rid": 5, "full_update": True, "torrents": {"abc": {"state": "uploading"}}})
+    mirror.apply({"rid": 1, "full_update": True, "torrents": {"def": {"state": "pausedUP"}}})
+    assert mirror.rid == 1
+    assert mirror.get("abc") is None
+    assert mirror.get("def")["state"] == "pausedUP"
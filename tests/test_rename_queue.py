@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+import rename_queue
+from rename_queue import RenameQueue
+from scan_snapshots import ScanSnapshotStore
+
+class FakeQbManager:
+    def __init__(self, queue, torrent):
+        self.queue = queue
+        self.torrent = torrent
+
+    async def get_torrent_index(self):
+        return self
+
+    def get_by_hash(self, torrent_hash):
+        return self.torrent
+
+    async def rename_torrent_files(self, torrent_hash, save_path, series_name, season, torrent_id, socketio):
+        # Пока идёт переименование, новое сканирование ставит тот же торрент заново
+        self.queue.enqueue(torrent_hash, save_path, "Новое название", season, torrent_id)
+
+class FakeAuthManager:
+    def __init__(self):
+        self.qb_manager = None
+
+    def get_qb_client(self):
+        return True
+
+    def get_qb_manager(self):
+        return self.qb_manager
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(rename_queue, "RENAME_QUEUE_FILE", str(tmp_path / "rename_queue.json"))
+    monkeypatch.setattr(rename_queue, "is_torrent_completed", lambda torrent: True)
+    store = ScanSnapshotStore(str(tmp_path / "scan_snapshots"))
+    monkeypatch.setattr(rename_queue, "get_snapshot_store", lambda: store)
+    return RenameQueue(FakeAuthManager(), socketio=None)
+
+def test_job_enqueued_during_rename_is_kept(queue):
+    queue.auth_manager.qb_manager = FakeQbManager(queue, torrent=object())
+    queue.enqueue("abc", "/downloads", "Старое название", "s01", "42")
+    asyncio.run(queue.process_pending())
+    assert queue.jobs["abc"]["series_name"] == "Новое название"
+
+def test_queued_at_is_timezone_aware(queue):
+    queue.enqueue("abc", "/downloads", "Название", "s01", "42")
+    assert queue.jobs["abc"]["queued_at"].endswith("+00:00")
@@ -0,0 +1,58 @@
+import asyncio
+from monitor import skip_unchanged_rutracker
+from qbittorrent_async import TorrentRecord
+from qbittorrent_manager import TorrentIndex
+from scrapers.http_transport import HttpClient, HttpTransport
+from scrapers.rutracker_api import MAX_TOPICS_PER_REQUEST, RutrackerTopicApi
+from tests.rutracker_api_server import RutrackerApiStandIn, fake_info_hash
+
+TOPIC_URL = "https://rutracker.org/forum/viewtopic.php?t={}"
+
+def run_with_api(stand_in: RutrackerApiStandIn, check):
+    """Выполняет check(api) против локального сервера в отдельном цикле событий."""
+    async def scenario():
+        async with stand_in:
+            api = RutrackerTopicApi(stand_in.base_url)
+            # Свой пул соединений: общий привязан к циклу событий приложения
+            transport = HttpTransport()
+            api.http = HttpClient(headers={"Accept": "application/json"}, transport=transport)
+            try:
+                return await check(api)
+            finally:
+                await api.http._get_session().close()
+                await transport.connector().close()
+    return asyncio.run(scenario())
+
+def torrent_index(hashes):
+    return TorrentIndex([TorrentRecord(hash=torrent_hash, tags=topic_id) for topic_id, torrent_hash in hashes.items()])
+
+def test_info_hashes_are_requested_in_chunks_of_100():
+    topic_ids = [str(topic_id) for topic_id in range(1, 251)]
+    stand_in = RutrackerApiStandIn({topic_id: fake_info_hash(topic_id) for topic_id in topic_ids})
+    hashes = run_with_api(stand_in, lambda api: api.get_info_hashes(topic_ids))
+    assert sorted(len(chunk) for chunk in stand_in.requests) == [50, MAX_TOPICS_PER_REQUEST, MAX_TOPICS_PER_REQUEST]
+    assert sorted(sum(stand_in.requests, [])) == sorted(topic_ids)
+    # API отдаёт хэш в верхнем регистре, qBittorrent — в нижнем
+    assert hashes == {topic_id: fake_info_hash(topic_id) for topic_id in topic_ids}
+
+def test_deleted_topics_have_no_info_hash():
+    stand_in = RutrackerApiStandIn({"1": fake_info_hash("1"), "2": None})
+    hashes = run_with_api(stand_in, lambda api: api.get_info_hashes(["1", "2", "3"]))
+    assert hashes == {"1": fake_info_hash("1"), "2": None, "3": None}
+
+def test_skip_unchanged_rutracker():
+    unchanged, changed, deleted, new = (TOPIC_URL.format(topic_id) for topic_id in ("1", "2", "3", "4"))
+    other_tracker = "https://kinozal.tv/details.php?id=2090001"
+    series_urls = [unchanged, changed, deleted, new, other_tracker]
+    stand_in = RutrackerApiStandIn({"1": fake_info_hash("1"), "2": fake_info_hash("2-new"), "4": fake_info_hash("4")})
+    index = torrent_index({"1": fake_info_hash("1"), "2": fake_info_hash("2"), "3": fake_info_hash("3")})
+    result = run_with_api(stand_in, lambda api: skip_unchanged_rutracker(series_urls, api, index))
+    # Без торрента в qBittorrent тема сканируется, даже если хэш есть в API
+    assert result == [changed, deleted, new, other_tracker]
+    assert stand_in.requests == [["1", "2", "3", "4"]]
+
+def test_api_error_scans_all_topics():
+    series_urls = [TOPIC_URL.format("1"), TOPIC_URL.format("2")]
+    stand_in = RutrackerApiStandIn({"1": fake_info_hash("1")}, fail=True)
+    index = torrent_index({"1": fake_info_hash("1")})
+    assert run_with_api(stand_in, lambda api: skip_unchanged_rutracker(series_urls, api, index)) == series_urls
@@ -0,0 +1,34 @@
+from scan_queue import ScanQueue
+
+class FakeSocketIO:
+    def emit(self, event, data):
+        pass
+
+def make_queue():
+    return ScanQueue(auth_manager=None, socketio=FakeSocketIO(), config={})
+
+def test_refresh_reuses_pending_scan():
+    queue = make_queue()
+    scan_future, created = queue.enqueue("https://rutracker.org/forum/viewtopic.php?t=1")
+    refresh_future, refresh_created = queue.enqueue("https://rutracker.org/forum/viewtopic.php?t=1", manual=True, refresh_only=True)
+    assert created and not refresh_created
+    assert refresh_future is scan_future
+    # Ручное обновление поднимает ждущее плановое сканирование
+    assert queue.stats()["queued"][0]["source"] == "manual"
+
+def test_scan_is_not_replaced_by_pending_refresh():
+    queue = make_queue()
+    refresh_future, _ = queue.enqueue("https://rutracker.org/forum/viewtopic.php?t=1", manual=True, refresh_only=True)
+    scan_future, created = queue.enqueue("https://rutracker.org/forum/viewtopic.php?t=1")
+    assert created
+    assert scan_future is not refresh_future
+    assert [job["refresh_only"] for job in queue.stats()["queued"]] == [True, False]
+
+def test_refresh_respects_domain_limits():
+    queue = make_queue()
+    queue.domain_concurrency["rutracker.org"] = 1
+    queue.enqueue("https://rutracker.org/forum/viewtopic.php?t=1")
+    queue.enqueue("https://rutracker.org/forum/viewtopic.php?t=2", manual=True, refresh_only=True)
+    first = queue._take_job()
+    assert first["refresh_only"] and first["series_url"].endswith("t=2")
+    assert queue._take_job() is None
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+from qbittorrent_manager import TorrentIndex
+from qbittorrent_async import TorrentRecord
+from scan_snapshots import ScanSnapshotStore, build_status, capture_snapshot
+
+SERIES_URL = "https://rutracker.org/forum/viewtopic.php?t=1"
+EPISODES = [{"name": "Show", "torrent_id": "1"}, {"name": "Show", "torrent_id": "2"}]
+
+class FakeClient:
+    def __init__(self):
+        self.files_requests = []
+
+    async def torrents_files(self, torrent_hash):
+        self.files_requests.append(torrent_hash)
+        return [TorrentRecord(name=f"{torrent_hash}/Show.S01E01.mkv")]
+
+class FakeQbManager:
+    def __init__(self, torrents):
+        self.client = FakeClient()
+        self.torrents = torrents
+
+    async def get_torrent_index(self):
+        return TorrentIndex(self.torrents)
+
+    async def get_torrent_statuses(self, hashes):
+        return {t.hash: {"state": "Завершено" if t.progress == 1 else "Загрузка", "completed": t.progress == 1} for t in self.torrents if t.hash in hashes}
+
+def torrent(torrent_hash, tag, progress=1):
+    return TorrentRecord(hash=torrent_hash, tags=tag, progress=progress, state="uploading" if progress == 1 else "downloading")
+
+def capture(qb_manager, previous=None):
+    return asyncio.run(capture_snapshot(qb_manager, EPISODES, previous=previous))
+
+def test_files_are_fetched_once_per_completed_hash():
+    qb_manager = FakeQbManager([torrent("aaa", "1"), torrent("bbb", "2", progress=0.5)])
+    first = capture(qb_manager)
+    assert qb_manager.client.files_requests == ["aaa"]
+    assert first["torrents"]["1"]["files"] == ["aaa/Show.S01E01.mkv"]
+    assert "files" not in first["torrents"]["2"]
+
+    # Второе сканирование: хэш тот же, второй торрент докачался
+    qb_manager.torrents = [torrent("aaa", "1"), torrent("bbb", "2")]
+    second = capture(qb_manager, previous=first)
+    assert qb_manager.client.files_requests == ["aaa", "bbb"]
+    assert second["torrents"]["1"]["files"] == ["aaa/Show.S01E01.mkv"]
+
+def test_replaced_torrent_gets_new_file_list():
+    qb_manager = FakeQbManager([torrent("aaa", "1")])
+    first = capture(qb_manager)
+    qb_manager.torrents = [torrent("ccc", "1")]
+    second = capture(qb_manager, previous=first)
+    assert qb_manager.client.files_requests == ["aaa", "ccc"]
+    assert second["torrents"]["1"]["files"] == ["ccc/Show.S01E01.mkv"]
+
+def test_forget_files_after_rename(tmp_path):
+    store = ScanSnapshotStore(str(tmp_path / "scan_snapshots"))
+    qb_manager = FakeQbManager([torrent("aaa", "1"), torrent("bbb", "2")])
+    store.put(SERIES_URL, capture(qb_manager))
+    store.forget_files("aaa")
+    snapshot = ScanSnapshotStore(str(tmp_path / "scan_snapshots")).get(SERIES_URL)
+    assert snapshot["stale"]
+    assert "files" not in snapshot["torrents"]["1"]
+    assert snapshot["torrents"]["2"]["files"] == ["bbb/Show.S01E01.mkv"]
+    capture(qb_manager, previous=snapshot)
+    assert qb_manager.client.files_requests == ["aaa", "bbb", "aaa"]
+
+def test_store_writes_one_file_per_series(tmp_path):
+    store = ScanSnapshotStore(str(tmp_path / "scan_snapshots"))
+    snapshot = capture(FakeQbManager([]))
+    store.put(SERIES_URL, snapshot)
+    store.put("https://kinozal.tv/details.php?id=2", snapshot)
+    assert len(list((tmp_path / "scan_snapshots").iterdir())) == 2
+    store.remove(SERIES_URL)
+    assert len(list((tmp_path / "scan_snapshots").iterdir())) == 1
+    assert list(ScanSnapshotStore(str(tmp_path / "scan_snapshots")).snapshots) == ["https://kinozal.tv/details.php?id=2"]
+
+def test_build_status_uses_stored_files():
+    snapshot = capture(FakeQbManager([torrent("aaa", "1")]))
+    status = build_status(snapshot, {"series_name": "Show", "season": "s01"})
+    assert status["status_data"]["downloaded"] == 1
+    assert status["rename_preview"] == [{
+        "current_name": "aaa/Show.S01E01.mkv",
+        "new_name": "aaa/Show s01e01.mkv",
+        "torrent_hash": "aaa",
+        "torrent_id": "1"
+    }]
@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from scrapers import session_store
+from scrapers.session_store import SessionStore, TrackerSessionMixin
+
+LOGIN_URL = "https://tracker.example/login.php"
+
+class FakeHttp:
+    """Трекер, у которого сохранённая сессия истекла: страницы отдаются только после нового входа."""
+    def __init__(self):
+        self.cookies = []
+        self.logins = 0
+
+    def import_cookies(self, cookies):
+        self.cookies = list(cookies)
+
+    def export_cookies(self):
+        return list(self.cookies)
+
+    def clear_cookies(self):
+        self.cookies = []
+
+    def has_cookie(self, name):
+        return any(cookie["name"] == name for cookie in self.cookies)
+
+    async def post(self, url, **kwargs):
+        self.logins += 1
+        await asyncio.sleep(0.01)
+        self.cookies = [{"name": "sid", "value": str(self.logins)}]
+        return SimpleNamespace(url="https://tracker.example/index.php")
+
+    async def get(self, url, **kwargs):
+        await asyncio.sleep(0.01)
+        if not any(cookie["value"] != "expired" for cookie in self.cookies if cookie["name"] == "sid"):
+            return SimpleNamespace(url=LOGIN_URL + "?redirect=" + url, status_code=200, headers={})
+        return SimpleNamespace(url=url, status_code=200, headers={})
+
+class FakeTrackerScraper(TrackerSessionMixin):
+    tracker = "example"
+    site = "tracker.example"
+    session_cookie = "sid"
+
+    def __init__(self, username="user", password="secret"):
+        self.http = FakeHttp()
+        self.login_url = LOGIN_URL
+        self.username = username
+        self.password = password
+        self.restore_session()
+
+    async def submit_login_form(self):
+        return await self.http.post(self.login_url, data={"username": self.username})
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    store = SessionStore(str(tmp_path / "tracker_sessions.json"))
+    monkeypatch.setattr(session_store, "_session_store", store)
+    return store
+
+def fetch_concurrently(scraper, count):
+    async def fetch_all():
+        return await asyncio.gather(*(scraper.fetch("get", f"https://tracker.example/page{i}") for i in range(count)))
+    return asyncio.run(fetch_all())
+
+def test_concurrent_first_requests_log_in_once(store):
+    scraper = FakeTrackerScraper()
+    responses = fetch_concurrently(scraper, 4)
+    assert scraper.http.logins == 1
+    assert all("login.php" not in response.url for response in responses)
+    assert store.get(scraper.session_key) == [{"name": "sid", "value": "1"}]
+
+def test_expired_saved_session_is_renewed_once(store):
+    store.put(FakeTrackerScraper().session_key, [{"name": "sid", "value": "expired"}])
+    scraper = FakeTrackerScraper()
+    assert scraper.logged_in
+    responses = fetch_concurrently(scraper, 4)
+    assert scraper.http.logins == 1
+    assert all("login.php" not in response.url for response in responses)
+
+def test_scraper_must_submit_login_form():
+    class NoLoginForm(TrackerSessionMixin):
+        pass
+    with pytest.raises(TypeError):
+        NoLoginForm()
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import re
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+def _decode(data: bytes, pos: int) -> Tuple[object, int]:
+    """Декодирует одно bencode-значение, начиная с позиции pos. Возвращает значение и позицию за ним."""
+    token = data[pos:pos + 1]
+    if token == b"i":
+        end = data.index(b"e", pos)
+        return int(data[pos + 1:end]), end + 1
+    if token == b"l":
+        pos += 1
+        items = []
+        while data[pos:pos + 1] != b"e":
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos + 1
+    if token == b"d":
+        pos += 1
+        result = {}
+        while data[pos:pos + 1] != b"e":
+            key, pos = _decode(data, pos)
+            result[key], pos = _decode(data, pos)
+        return result, pos + 1
+    if token.isdigit():
+        colon = data.index(b":", pos)
+        length = int(data[pos:colon])
+        start = colon + 1
+        if start + length > len(data):
+            raise ValueError("Обрезанная строка в bencode")
+        return data[start:start + length], start + length
+    raise ValueError(f"Некорректный bencode на позиции {pos}")
+
+def bdecode(data: bytes):
+    value, end = _decode(data, 0)
+    if end != len(data):
+        raise ValueError("Лишние данные после bencode-значения")
+    return value
+
+def _info_span(data: bytes) -> Tuple[int, int]:
+    """Возвращает границы сырого словаря info в торрент-файле: хэш считается именно по этим байтам."""
+    if data[:1] != b"d":
+        raise ValueError("Торрент-файл должен начинаться со словаря")
+    pos = 1
+    while data[pos:pos + 1] != b"e":
+        key, pos = _decode(data, pos)
+        start = pos
+        _, pos = _decode(data, pos)
+        if key == b"info":
+            if data[start:start + 1] != b"d":
+                raise ValueError("Значение info в торрент-файле не словарь")
+            return start, pos
+    raise ValueError("В торрент-файле нет словаря info")
+
+def infohash_from_torrent(data: bytes) -> str:
+    """Infohash торрент-файла в том виде, в каком его показывает qBittorrent."""
+    start, end = _info_span(data)
+    raw_info = data[start:end]
+    info = bdecode(raw_info)
+    if info.get(b"meta version") == 2 and b"pieces" not in info:
+        # Торрент только v2: qBittorrent использует усечённый SHA-256
+        return hashlib.sha256(raw_info).hexdigest()[:40]
+    return hashlib.sha1(raw_info).hexdigest()
+
+def torrent_layout(data: bytes) -> Tuple[int, List[Tuple[str, int]]]:
+    """Размер куска и файлы торрент-файла v1: пары (путь, как его показывает qBittorrent, размер)."""
+    start, end = _info_span(data)
+    info = bdecode(data[start:end])
+    if b"pieces" not in info:
+        raise ValueError("Торрент без v1-раскладки кусков")
+    name = (info.get(b"name.utf-8") or info[b"name"]).decode("utf-8", errors="replace")
+    if b"files" not in info:
+        return info[b"piece length"], [(name, info[b"length"])]
+    files = []
+    for entry in info[b"files"]:
+        # Выравнивающие файлы qBittorrent не показывает
+        if b"p" in entry.get(b"attr", b""):
+            continue
+        parts = entry.get(b"path.utf-8") or entry[b"path"]
+        files.append(("/".join([name] + [part.decode("utf-8", errors="replace") for part in parts]), entry[b"length"]))
+    return info[b"piece length"], files
+
+def infohash_from_magnet(magnet_link: str) -> Optional[str]:
+    """Извлекает btih из magnet-ссылки (hex или base32) и приводит к нижнему регистру hex."""
+    for xt in parse_qs(urlparse(magnet_link).query).get("xt", []):
+        match = re.fullmatch(r"urn:btih:([0-9a-fA-F]{40}|[A-Za-z2-7]{32})", xt)
+        if not match:
+            continue
+        value = match.group(1)
+        if len(value) == 32:
+            return base64.b32decode(value.upper()).hex()
+        return value.lower()
+    return None
+
+def get_infohash(torrent_content: bytes | str) -> Optional[str]:
+    """Infohash для содержимого торрента: байты .torrent-файла или magnet-ссылка."""
+    try:
+        if isinstance(torrent_content, bytes):
+            return infohash_from_torrent(torrent_content)
+        if isinstance(torrent_content, str) and torrent_content.startswith("magnet:"):
+            return infohash_from_magnet(torrent_content)
+    except (ValueError, IndexError, KeyError, TypeError, AttributeError):
+        # Повреждённый торрент не должен прерывать сканирование сериала
+        return None
+    return None